@@ -0,0 +1,90 @@
+from time import perf_counter
+from typing import Callable, Dict, Hashable, Tuple
+
+STARVE_FRAMES = 30      # an agent waiting this many frames to think is starved
+AGE_WEIGHT = 0.25       # how much each frame waited raises an agent's priority
+
+
+class AIScheduler:
+    """ Spreads the AI's thinking across frames under a time budget
+
+    Every agent registers a think task. Each frame the tasks are run in
+    order of priority until the frame's budget is spent, the rest wait
+    for a later frame. An agent's priority comes from the caller, e.g.
+    agents on screen or close to the player first, and rises the longer
+    it has waited. Starved agents jump the queue so none waits forever.
+    At least one task is run every frame, however small the budget.
+
+    Only the thinking is scheduled, movement is left to the ShipStore
+    and still happens every tick.
+    """
+
+    def __init__(self, budget_ms: float = 2.0) -> None:
+        """ Creates a scheduler with no agents
+
+        Args:
+            budget_ms (float): The milliseconds per frame the tasks may use
+        """
+        self.budget_ms = budget_ms
+        self.tasks: Dict[Hashable, Callable[[], None]] = {}
+        self.waiting: Dict[Hashable, int] = {}
+
+        # what happened on the last frame
+        self.ran = 0
+        self.deferred = 0
+        self.starved = 0
+
+    def __len__(self) -> int:
+        return len(self.tasks)
+
+    def add(self, agent: Hashable, think: Callable[[], None]) -> None:
+        """ Registers an agent's think task
+
+        Args:
+            agent (Hashable): The agent, i.e. an Enemy
+            think (Callable): Called when it's the agent's turn to think
+        """
+        self.tasks[agent] = think
+        self.waiting[agent] = 0
+
+    def remove(self, agent: Hashable) -> None:
+        """ Stops scheduling an agent """
+        self.tasks.pop(agent, None)
+        self.waiting.pop(agent, None)
+
+    def clear(self) -> None:
+        """ Removes every agent """
+        self.tasks.clear()
+        self.waiting.clear()
+
+    def run(self, priority: Callable[[Hashable], Tuple[bool, float]]) -> None:
+        """ Runs the most urgent think tasks that fit in the budget
+
+        Args:
+            priority (Callable): Returns (urgent, distance) for an agent.
+                Starved agents go first, then urgent agents, then the
+                closest. Waiting shortens an agent's distance by
+                AGE_WEIGHT per frame waited.
+        """
+        def order(agent):
+            waited = self.waiting[agent]
+            urgent, distance = priority(agent)
+            return waited < STARVE_FRAMES, not urgent, distance / (1 + waited * AGE_WEIGHT)
+
+        queue = sorted(self.tasks, key=order)
+        deadline = perf_counter() + self.budget_ms / 1000
+
+        self.ran = 0
+        for agent in queue:
+            if self.ran and perf_counter() >= deadline:
+                break
+            self.tasks[agent]()
+            self.waiting[agent] = 0
+            self.ran += 1
+
+        self.deferred = len(queue) - self.ran
+        self.starved = 0
+        for agent in queue[self.ran:]:
+            self.waiting[agent] += 1
+            if self.waiting[agent] >= STARVE_FRAMES:
+                self.starved += 1
@@ -0,0 +1,31 @@
+from typing import Dict, List
+
+import pygame
+
+# every surface that has been loaded, keyed by its filename
+images: Dict[str, pygame.Surface] = {}
+
+
+def load_image(filename: str) -> pygame.Surface:
+    """ Loads an image once and shares it between all the sprites using it
+
+    The returned surface is shared, so sprites must not draw on to it.
+    Take a copy or transform it instead.
+
+    Args:
+        filename (str): The image to load
+    """
+    image = images.get(filename)
+    if image is None:
+        image = pygame.image.load(filename).convert_alpha()
+        images[filename] = image
+    return image
+
+
+def load_images(filenames: List[str]) -> List[pygame.Surface]:
+    """ Loads a list of shared images, see load_image
+
+    Args:
+        filenames (List[str]): The images to load
+    """
+    return [load_image(filename) for filename in filenames]
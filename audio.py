@@ -0,0 +1,130 @@
+import threading
+from typing import Dict, Optional
+
+import pygame
+
+MUSIC_FILE = "data/audio/the-buccaneers-haul.ogg"
+EFFECT_CHANNELS = 8
+
+
+class Audio:
+    """ Streams the background music and plays sound effects
+
+    The mixer is only initialised the first time it is needed and the
+    background music is streamed from disk with pygame.mixer.music on a
+    separate thread, so the whole track never has to be decoded into
+    memory before the first frame. Sound effects are preloaded into
+    buffers and played on a reserved pool of channels. If the audio
+    device or a file is missing the game carries on silently.
+    """
+
+    def __init__(self, volume: float = 0.5) -> None:
+        """ Initialises the audio settings without touching the mixer
+
+        Args:
+            volume (float): The background music volume between 0 and 1
+        """
+        self.volume = volume
+        self.muted = False
+        self.available = None   # unknown until the mixer is first used
+        self.effects: Dict[str, pygame.mixer.Sound] = {}
+        self.channels = []
+        self.next_channel = 0
+        self.loader: Optional[threading.Thread] = None
+        self.lock = threading.Lock()
+
+    def init(self) -> bool:
+        """ Lazily initialises the mixer and the sound effect channels
+
+        Returns True if audio can be played, False if there is no
+        usable audio device.
+        """
+        with self.lock:
+            if self.available is not None:
+                return self.available
+
+            try:
+                if not pygame.mixer.get_init():
+                    pygame.mixer.init()
+                pygame.mixer.set_num_channels(max(pygame.mixer.get_num_channels(), EFFECT_CHANNELS))
+                pygame.mixer.set_reserved(EFFECT_CHANNELS)
+                self.channels = [pygame.mixer.Channel(i) for i in range(EFFECT_CHANNELS)]
+                self.available = True
+            except pygame.error as error:
+                print(f'audio disabled: {error}')
+                self.available = False
+
+            return self.available
+
+    def play_music(self, filename: str = MUSIC_FILE) -> None:
+        """ Starts streaming the background music without blocking
+
+        Args:
+            filename (str): The music file to stream in a loop
+        """
+        self.loader = threading.Thread(target=self._stream, args=(filename,), name="music-loader", daemon=True)
+        self.loader.start()
+
+    def _stream(self, filename: str) -> None:
+        """ Opens the music stream, run on the loader thread """
+        if not self.init():
+            return
+
+        try:
+            pygame.mixer.music.load(filename)
+            pygame.mixer.music.set_volume(0 if self.muted else self.volume)
+            pygame.mixer.music.play(-1)
+        except (pygame.error, FileNotFoundError) as error:
+            print(f'unable to play {filename}: {error}')
+
+    def toggle_mute(self) -> None:
+        """ Mutes or unmutes the background music """
+        self.muted = not self.muted
+        if self.available:
+            pygame.mixer.music.set_volume(0 if self.muted else self.volume)
+
+    def preload(self, name: str, filename: str) -> None:
+        """ Decodes a sound effect in to memory so it plays without delay
+
+        Args:
+            name (str): The name used to play the effect
+            filename (str): The sound file to load
+        """
+        if not self.init():
+            return
+
+        try:
+            self.effects[name] = pygame.mixer.Sound(filename)
+        except (pygame.error, FileNotFoundError) as error:
+            print(f'unable to load {filename}: {error}')
+
+    def play(self, name: str) -> None:
+        """ Plays a preloaded sound effect on the channel pool
+
+        Free channels are preferred, when they are all busy the
+        oldest one is reused. Unknown effects are ignored.
+
+        Args:
+            name (str): The name the effect was preloaded with
+        """
+        effect = self.effects.get(name)
+        if effect is None or not self.channels:
+            return
+
+        index = self.next_channel
+        for offset in range(len(self.channels)):
+            candidate = (self.next_channel + offset) % len(self.channels)
+            if not self.channels[candidate].get_busy():
+                index = candidate
+                break
+
+        self.channels[index].play(effect)
+        self.next_channel = (index + 1) % len(self.channels)
+
+    def stop(self) -> None:
+        """ Waits for the loader and stops any playing audio """
+        if self.loader is not None:
+            self.loader.join()
+        if self.available:
+            pygame.mixer.music.stop()
+            pygame.mixer.stop()
@@ -1,4 +1,7 @@
 import pygame
+
+from assets import load_image
+
 CANNONBALL_SPEED = 8
 
 
@@ -14,11 +17,12 @@ class CannonBall(pygame.sprite.Sprite):
             dest (pygame.Vector2): It's intended destination.
         """
         pygame.sprite.Sprite.__init__(self)
-        self.image = pygame.image.load("data/sprites/ship parts/cannonBall.png").convert_alpha()
+        self.image = load_image("data/sprites/ship parts/cannonBall.png")
         self.rect = self.image.get_rect()
         self.rect.center = (spawn[0], spawn[1])
         self.destination = dest
         self.position = pygame.Vector2(spawn)
+        self.previous = pygame.Vector2(spawn)   # where the last update moved from
 
     def update(self, dt: float) -> None:
         """ Updates the cannonball instance using lerp. It will continue
@@ -30,6 +34,7 @@ class CannonBall(pygame.sprite.Sprite):
         Args:
             dt (float): The time between ticks.
         """
+        self.previous = self.position
         lerped = self.position.lerp(self.destination, min(CANNONBALL_SPEED * dt, 1))
         self.position = lerped
         self.rect.topleft = self.position
@@ -0,0 +1,175 @@
+from heapq import heappop, heappush
+from math import inf, sqrt
+from typing import Dict, List, Optional, Tuple
+
+from gamemap import GameMap
+from instrument import tracer
+
+DIAGONAL = sqrt(2)
+
+
+class DStarLite:
+    """ An incremental path planner for one moving ship
+
+    D* Lite searches backwards from the goal and keeps its search state
+    between plans. When the cost of some tiles changes, only the part of
+    the search affected by those tiles is repaired, so replanning after
+    a small change costs a fraction of a full search. The planner
+    listens to the GameMap for cost changes, call release when the ship
+    no longer needs it.
+
+    Moving in to a tile costs the length of the step plus the tile's
+    cost and tiles costing more than 100 can't be entered.
+    See: Koenig & Likhachev, "D* Lite", AAAI 2002
+    """
+
+    def __init__(self, gamemap: GameMap, start: Tuple[int, int], goal: Tuple[int, int]) -> None:
+        """ Prepares a search from start to goal
+
+        Args:
+            gamemap (GameMap): The map to plan over
+            start (Tuple[int,int]): The ship's current tile
+            goal (Tuple[int,int]): The tile to sail to
+        """
+        self.gamemap = gamemap
+        self.width = len(gamemap.costs[0])
+        self.height = len(gamemap.costs)
+        self.start = start
+        self.goal = goal
+        self.last = start
+        self.km = 0.0
+        self.expanded = 0
+        self.pushes = 0
+
+        self.g: Dict[Tuple[int, int], float] = {}
+        self.rhs: Dict[Tuple[int, int], float] = {goal: 0.0}
+        self.open = []
+        self.keys: Dict[Tuple[int, int], Tuple[float, float]] = {}
+        self.changed = set()
+        self.push(goal)
+
+        gamemap.add_cost_listener(self.costs_changed)
+
+    def release(self) -> None:
+        """ Stops listening for cost changes """
+        self.gamemap.remove_cost_listener(self.costs_changed)
+
+    def costs_changed(self, tiles: List[Tuple[int, int]]) -> None:
+        """ Remembers which tiles changed, they are repaired on the next replan """
+        self.changed.update(tiles)
+
+    def heuristic(self, a: Tuple[int, int], b: Tuple[int, int]) -> float:
+        """ The octile distance, the shortest possible route ignoring costs """
+        dx = abs(a[0] - b[0])
+        dy = abs(a[1] - b[1])
+        return max(dx, dy) + (DIAGONAL - 1) * min(dx, dy)
+
+    def neighbours(self, tile: Tuple[int, int]) -> List[Tuple[int, int]]:
+        """ The tiles around a tile, all eight directions """
+        x, y = tile
+        return [(x + dx, y + dy)
+                for dx in (-1, 0, 1) for dy in (-1, 0, 1)
+                if (dx or dy) and 0 <= x + dx < self.width and 0 <= y + dy < self.height]
+
+    def cost(self, a: Tuple[int, int], b: Tuple[int, int]) -> float:
+        """ The cost of moving from tile a in to its neighbour b """
+        tile_cost = self.gamemap.costs[b[1]][b[0]]
+        if tile_cost > 100:
+            return inf
+        step = DIAGONAL if a[0] != b[0] and a[1] != b[1] else 1.0
+        return step + tile_cost
+
+    def key(self, tile: Tuple[int, int]) -> Tuple[float, float]:
+        best = min(self.g.get(tile, inf), self.rhs.get(tile, inf))
+        return best + self.heuristic(self.start, tile) + self.km, best
+
+    def push(self, tile: Tuple[int, int]) -> None:
+        """ Adds a tile to the open list, replacing any older entry for it """
+        key = self.key(tile)
+        self.keys[tile] = key
+        heappush(self.open, (key[0], key[1], tile))
+        self.pushes += 1
+
+    def top(self):
+        """ Returns the smallest valid key and its tile, skipping stale entries """
+        while self.open:
+            k1, k2, tile = self.open[0]
+            if self.keys.get(tile) == (k1, k2):
+                return (k1, k2), tile
+            heappop(self.open)
+        return (inf, inf), None
+
+    def update_vertex(self, tile: Tuple[int, int]) -> None:
+        if tile != self.goal:
+            self.rhs[tile] = min((self.cost(tile, after) + self.g.get(after, inf)
+                                  for after in self.neighbours(tile)), default=inf)
+
+        if self.g.get(tile, inf) != self.rhs.get(tile, inf):
+            self.push(tile)
+        else:
+            self.keys.pop(tile, None)
+
+    def compute(self) -> None:
+        """ Expands tiles until the start's cost is known """
+        while True:
+            old_key, tile = self.top()
+            if tile is None:
+                return
+            if old_key >= self.key(self.start) and self.rhs.get(self.start, inf) == self.g.get(self.start, inf):
+                return
+
+            heappop(self.open)
+            del self.keys[tile]
+            self.expanded += 1
+
+            new_key = self.key(tile)
+            if old_key < new_key:
+                self.push(tile)
+            elif self.g.get(tile, inf) > self.rhs.get(tile, inf):
+                self.g[tile] = self.rhs[tile]
+                for before in self.neighbours(tile):
+                    self.update_vertex(before)
+            else:
+                self.g[tile] = inf
+                self.update_vertex(tile)
+                for before in self.neighbours(tile):
+                    self.update_vertex(before)
+
+    def plan(self, start: Tuple[int, int] = None) -> Optional[List[Tuple[int, int]]]:
+        """ Returns the tiles from start to the goal, repairing the search first
+
+        Any tiles that changed cost since the last plan are repaired
+        here. The result includes the start tile, or is None if the goal
+        can't be reached.
+
+        Args:
+            start (Tuple[int,int]): The ship's current tile, if it has moved
+        """
+        self.expanded = 0
+        self.pushes = 0
+
+        if start is not None and start != self.start:
+            self.start = start
+            self.km += self.heuristic(self.last, start)
+            self.last = start
+
+        if self.changed:
+            changed, self.changed = self.changed, set()
+            for tile in changed:
+                self.update_vertex(tile)
+                for before in self.neighbours(tile):
+                    self.update_vertex(before)
+
+        self.compute()
+
+        if self.g.get(self.start, inf) == inf:
+            tracer.counter("pathfinder", expanded=self.expanded, pushes=self.pushes, length=0)
+            return None
+
+        tile = self.start
+        path = [tile]
+        while tile != self.goal and len(path) <= self.width * self.height:
+            tile = min(self.neighbours(tile), key=lambda after: self.cost(tile, after) + self.g.get(after, inf))
+            path.append(tile)
+        tracer.counter("pathfinder", expanded=self.expanded, pushes=self.pushes, length=len(path))
+        return path
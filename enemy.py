@@ -1,10 +1,17 @@
-import pygame
-
 from fsm import FSM
+from intent import Intent
+from ship import Ship
 from shipcondition import ShipCondition
+from shipstore import ShipStore
+
+# the threat each condition runs from, once settled the threat is about
+# the number of the player's ships within THREAT_RADIUS of the enemy
+FLEE_HEALTHY = 2.5          # the whole squadron
+FLEE_DAMAGED = 1.5          # any two ships
+FLEE_VERY_DAMAGED = 0.1     # any ship at all
 
 
-class Enemy(pygame.sprite.Sprite):
+class Enemy(Ship):
     """ An enemy ship
 
     This is a basic class to get you started. You will need to
@@ -13,17 +20,12 @@ class Enemy(pygame.sprite.Sprite):
     needs to be updated when the enemy takes damage.
     """
 
-    def __init__(self) -> None:
-        pygame.sprite.Sprite.__init__(self)
+    def __init__(self, store: ShipStore = None) -> None:
         filenames = ["data/sprites/ships/ship (4).png",
                      "data/sprites/ships/ship (10).png",
                      "data/sprites/ships/ship (16).png",
                      "data/sprites/ships/ship (22).png"]
-
-        self.base_list = [pygame.image.load(filename).convert_alpha() for filename in filenames]
-        self.base = self.base_list[0]
-        self.image = self.base.copy()
-        self.rect = self.image.get_rect()
+        super().__init__(filenames, store)
 
         self.rect.centerx = 0
         self.rect.centery = 0
@@ -34,6 +36,26 @@ class Enemy(pygame.sprite.Sprite):
         self.ship_condition = ShipCondition.HEALTHY
         self.hp = 10
 
+        # what the ship plans to do and the influence map it decides with
+        self.intent = Intent.PATROL
+        self.influence = None
+        self.flee_threat = FLEE_HEALTHY
+
+    def reset(self) -> None:
+        """ Repairs the ship and returns it to the origin ready to respawn """
+        self.fsm.setstate(self.update_healthy)
+        self.prev_ship_condition = ShipCondition.HEALTHY
+        self.ship_condition = ShipCondition.HEALTHY
+        self.hp = 10
+        self.path = []
+        self.intent = Intent.PATROL
+        self.flee_threat = FLEE_HEALTHY
+        self.redraw()
+        self.store.heading[self.index] = self.heading = 90.0
+
+        self.rect.centerx = 0
+        self.rect.centery = 0
+
     def update(self, dt: float) -> None:
         """ Updates the enemy and its FSM
 
@@ -45,6 +67,9 @@ class Enemy(pygame.sprite.Sprite):
             dt (float): The amount of time elapsed between ticks
         """
 
+        # keep the sprite where the ship is in the store
+        self.sync()
+
         # update the fsm
         self.fsm.update()
 
@@ -57,10 +82,44 @@ class Enemy(pygame.sprite.Sprite):
         """ Redraws the ship based on its condition """
         if self.ship_condition <= ShipCondition.SUNK:
             self.base = self.base_list[self.ship_condition]
-            self.image = self.base.copy()
+            self.image = self.base
+
+    def think(self) -> None:
+        """ Decides what to do next, run by GamePlay's AIScheduler
+
+        The FSM picks how brave the ship is every tick, but deciding is
+        left to the scheduler so it can be spread across frames.
+        """
+        self.decide(self.flee_threat)
+
+    def decide(self, flee_threat: float) -> None:
+        """ Picks an intent from the influence at the ship's position
+
+        The ship flees from cannon ball fire or from a player threat
+        above flee_threat. Otherwise it chases a nearby player, or
+        flanks them if other enemy ships are already close by.
+
+        Args:
+            flee_threat (float): The player threat the ship will run from
+        """
+        if self.influence is None:
+            return
+
+        threat, danger, density = self.influence.sample(self.rect.center)
+
+        # the ship's own contribution is part of the density
+        allies = density - 1
+
+        if danger > 0.5 or threat > flee_threat:
+            self.intent = Intent.FLEE
+        elif threat > 0.1:
+            self.intent = Intent.FLANK if allies > 0.5 else Intent.CHASE
+        else:
+            self.intent = Intent.PATROL
 
     def update_healthy(self):
         """ The first of your FSM functions, this one is complete """
+        self.flee_threat = FLEE_HEALTHY
 
         if self.hp <= 6:
             self.fsm.setstate(self.update_damaged)
@@ -68,6 +127,7 @@ class Enemy(pygame.sprite.Sprite):
 
     def update_damaged(self):
         """ Create the logic here for the ship when it's damaged """
+        self.flee_threat = FLEE_DAMAGED
 
         if self.hp <= 3:
             self.fsm.setstate(self.update_very_damaged)
@@ -75,6 +135,7 @@ class Enemy(pygame.sprite.Sprite):
 
     def update_very_damaged(self):
         """ Create the logic here for the ship when it's very damaged """
+        self.flee_threat = FLEE_VERY_DAMAGED
 
         if self.hp <= 0:
             self.fsm.setstate(self.dead)
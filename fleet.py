@@ -0,0 +1,196 @@
+from math import hypot
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from gamemap import GameMap
+from ship import Ship
+from shipstore import ShipStore
+
+FORMATION_SPACING = 96  # world-space distance between formation slots
+SEPARATION = 72         # ships closer than this are pushed apart
+
+
+class Fleet:
+    """ The player's squadron and the ships currently selected
+
+    An order only plans one path, for the leader of the selection.
+    Every other selected ship is given a slot in a wedge formation
+    behind the leader and follows the leader's waypoints shifted by
+    its slot, so an order costs about the same as a single path query
+    however many ships are selected. Ships that end up too close to
+    each other are pushed apart every tick.
+    """
+
+    def __init__(self, gamemap: GameMap, store: ShipStore, planners: dict) -> None:
+        """ Creates an empty fleet
+
+        Args:
+            gamemap (GameMap): The map the fleet sails on
+            store (ShipStore): The store holding every ship
+            planners (dict): The route planner of each ship with its own order
+        """
+        self.gamemap = gamemap
+        self.store = store
+        self.planners = planners
+        self.ships: List[Ship] = []
+        self.selected: List[Ship] = []
+        self.order_leader: Optional[Ship] = None
+        self.followers: List[Ship] = []
+
+    def add(self, ship: Ship) -> None:
+        """ Adds a ship to the fleet, the first ship added is the flagship """
+        self.ships.append(ship)
+        if not self.selected:
+            self.selected.append(ship)
+
+    @property
+    def leader(self) -> Optional[Ship]:
+        """ The selected ship that paths are planned for """
+        return self.selected[0] if self.selected else None
+
+    def ship_at(self, world_space: Tuple[int, int]) -> Optional[Ship]:
+        """ Returns the fleet's ship at a world-space position, if any """
+        for ship in self.ships:
+            if ship.rect.collidepoint(world_space):
+                return ship
+        return None
+
+    def toggle(self, ship: Ship) -> None:
+        """ Adds a ship to the selection or removes it, keeping fleet order """
+        if ship in self.selected:
+            self.selected.remove(ship)
+        else:
+            self.selected = [other for other in self.ships if other in self.selected or other is ship]
+
+    def reset(self) -> None:
+        """ Selects just the flagship and forgets the last order """
+        self.selected = self.ships[:1]
+        self.order_leader = None
+        self.followers = []
+
+    def select_all(self) -> None:
+        """ Selects the whole fleet, or just the flagship if it already is """
+        if len(self.selected) == len(self.ships):
+            self.selected = self.ships[:1]
+        else:
+            self.selected = self.ships[:]
+
+    def slots(self, count: int) -> List[Tuple[float, float]]:
+        """ The (behind, right) offsets of a wedge formation
+
+        Args:
+            count (int): How many followers need a slot
+        """
+        offsets = []
+        for slot in range(1, count + 1):
+            row = (slot + 1) // 2
+            side = row if slot % 2 else -row
+            offsets.append((row * FORMATION_SPACING, side * FORMATION_SPACING))
+        return offsets
+
+    def formation(self, origin: Tuple[float, float], waypoints: list, offset: Tuple[float, float],
+                  start: Tuple[float, float] = None) -> list:
+        """ Shifts the leader's waypoints in to a follower's formation slot
+
+        The slot is rotated to face along each leg of the route. Any
+        point that lands off the map or on a tile costing more than 100
+        falls back to the leader's waypoint, as does any point the
+        follower can't sail to in a straight line from its last one.
+
+        Args:
+            origin (Tuple[float,float]): Where the leader starts from
+            waypoints (list): The leader's world-space waypoints
+            offset (Tuple[float,float]): The slot's (behind, right) offset
+            start (Tuple[float,float]): Where the follower starts from, if the first leg should be checked
+        """
+        route = np.asarray([origin] + list(waypoints), dtype=np.float64)
+        legs = route[1:] - route[:-1]
+        lengths = np.hypot(legs[:, 0], legs[:, 1])
+        lengths[lengths == 0] = 1
+        forward = legs / lengths[:, None]
+        right = np.stack((-forward[:, 1], forward[:, 0]), axis=1)
+
+        points = route[1:] - forward * offset[0] + right * offset[1]
+
+        map_rect = self.gamemap.map.map_rect
+        inside = ((points[:, 0] >= 0) & (points[:, 0] < map_rect.w) &
+                  (points[:, 1] >= 0) & (points[:, 1] < map_rect.h))
+        clear = inside.copy()
+        clear[inside] = self.gamemap.costs_at(points[inside]) <= 100
+        points[~clear] = route[1:][~clear]
+
+        # the legs between the points may still cross land
+        points = points.tolist()
+        previous = start
+        for index, point in enumerate(points):
+            if previous is not None and not self.gamemap.line_of_sight(self.gamemap.tile(previous),
+                                                                       self.gamemap.tile(point)):
+                points[index] = route[index + 1].tolist()
+            previous = points[index]
+        return points
+
+    def assign(self, leader: Ship, followers: List[Ship] = None) -> None:
+        """ Gives the followers the leader's route in formation
+
+        Call after the leader's path has been planned or replanned. Any
+        planner left over from an order a follower led is dropped, so it
+        can't replace the formation path later.
+
+        Args:
+            leader (Ship): The ship whose path the others follow
+            followers (List[Ship]): The ships to follow, the rest of the selection if None
+        """
+        if followers is None:
+            followers = [ship for ship in self.selected if ship is not leader]
+        self.order_leader = leader
+        self.followers = followers
+        origin = leader.destination if leader.path else leader.position
+        for ship, offset in zip(self.followers, self.slots(len(self.followers))):
+            planner = self.planners.pop(ship, None)
+            if planner is not None:
+                planner.release()
+            ship.path = self.formation(origin, leader.path, offset, ship.position)
+
+    def separate(self) -> None:
+        """ Pushes the fleet's ships apart from any ship that is too close
+
+        Ships are bucketed in to a grid of SEPARATION sized cells so each
+        ship is only compared with those in the cells around it. A ship
+        is never pushed on to a tile costing more than 100.
+        """
+        store = self.store
+        cells = {}
+        for index in store.indices():
+            cell = (int(store.x[index] // SEPARATION), int(store.y[index] // SEPARATION))
+            cells.setdefault(cell, []).append(index)
+
+        for ship in self.ships:
+            index = ship.index
+            x, y = store.x[index], store.y[index]
+            cx, cy = int(x // SEPARATION), int(y // SEPARATION)
+            push_x = push_y = 0.0
+
+            for dx in (-1, 0, 1):
+                for dy in (-1, 0, 1):
+                    for other in cells.get((cx + dx, cy + dy), ()):
+                        if other == index:
+                            continue
+                        away_x = x - store.x[other]
+                        away_y = y - store.y[other]
+                        distance = hypot(away_x, away_y)
+                        if distance >= SEPARATION:
+                            continue
+                        if distance == 0:
+                            away_x, distance = 1.0, 1.0
+                        overlap = (SEPARATION - distance) * 0.5
+                        push_x += away_x / distance * overlap
+                        push_y += away_y / distance * overlap
+
+            if push_x or push_y:
+                moved = (x + push_x, y + push_y)
+                if self.gamemap.map.map_rect.collidepoint(moved) and self.gamemap.cost(moved) <= 100:
+                    # an idle ship stays where it was pushed rather than sailing back
+                    if not ship.path and (x, y) == ship.destination:
+                        ship.destination = moved
+                    store.x[index], store.y[index] = moved
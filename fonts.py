@@ -0,0 +1,36 @@
+from typing import Dict, Optional, Tuple
+
+import pygame
+
+from startupprofile import profile
+
+# the font file, or None for pygame's default font, and the size of each font
+FONTS: Dict[str, Tuple[Optional[str], int]] = {
+    "scoreboard": ("data/fonts/ErbosDraco1StNbpRegular-99V5.ttf", 72),
+    "menu": (None, 128),
+    "debug": (None, 18),
+}
+
+
+class Fonts:
+    """ The game's fonts, each loaded the first time it is used
+
+    Looks like a dictionary of pygame fonts, i.e. fonts["menu"], so
+    states can use it as before, but launching the game doesn't have to
+    wait for every font file to be opened and rasterised.
+    """
+
+    def __init__(self) -> None:
+        self.loaded: Dict[str, pygame.font.Font] = {}
+
+    def __getitem__(self, name: str) -> pygame.font.Font:
+        font = self.loaded.get(name)
+        if font is None:
+            filename, size = FONTS[name]
+            with profile.stage(f"font {name}"):
+                font = pygame.font.Font(filename or pygame.font.get_default_font(), size)
+            self.loaded[name] = font
+        return font
+
+    def __setitem__(self, name: str, font: pygame.font.Font) -> None:
+        self.loaded[name] = font
@@ -1,3 +1,7 @@
+import threading
+
+from audio import Audio
+from fonts import Fonts
 from gamemap import GameMap
 
 
@@ -14,7 +18,13 @@ class GameData:
     def __init__(self) -> None:
         """ Inits the shared fields
         """
-        self.background_audio = None
-        self.fonts = {}
-        self.gamemap = GameMap()
         self.background_volume = 0.5
+        self.audio = Audio(self.background_volume)
+        self.fonts = Fonts()
+        self.gamemap = GameMap()
+        self.minimap = None
+
+        # the map is loaded in the background, see PirateGame.loadMap
+        self.load_progress = 0.0
+        self.loaded = threading.Event()
+        self.ai_budget = 2.0    # milliseconds of AI thinking per frame
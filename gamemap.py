@@ -1,7 +1,13 @@
-from typing import Tuple
+import weakref
+from typing import Callable, Dict, List, Tuple
 
+import numpy as np
 import pygame
 
+# zoom levels below 1 are drawn from cached, pre-scaled tile layers,
+# the others are left to pyscroll which only ever scales the view up
+ZOOM_LEVELS = (0.25, 0.5, 1.0, 2.0)
+
 
 class GameMap:
     """ The view of the GameMap
@@ -14,8 +20,73 @@ class GameMap:
     def __init__(self):
         """ Initialises the game data class to sensible defaults"""
         self.islands = []   # collision rectangles
+        self.tile_w = 0     # tile size, cached when the map is set
+        self.tile_h = 0
         self.map = None     # the tiled map
         self.costs = []     # pathfinding costs
+        self.cost_listeners = []
+
+        # zoom, the world-space view when zoomed out and the scaled layers
+        self.zoom = 1.0
+        self.view = pygame.Rect(0, 0, 0, 0)
+        self.background = (100, 149, 237)
+        self.zoom_layers: Dict[float, pygame.Surface] = {}
+        self.zoomed_sprites = weakref.WeakKeyDictionary()
+
+    @property
+    def map(self):
+        return self._map
+
+    @map.setter
+    def map(self, value) -> None:
+        self._map = value
+        if value is not None:
+            self.tile_w, self.tile_h = value.data.tile_size
+
+    @property
+    def costs(self) -> List[List[int]]:
+        return self._costs
+
+    @costs.setter
+    def costs(self, value: List[List[int]]) -> None:
+        self._costs = value
+        self._cost_grid = None
+
+    def cost_grid(self) -> np.ndarray:
+        """ The cost map as a NumPy array indexed [y, x]
+
+        Built the first time it is asked for after the costs are set.
+        """
+        if self._cost_grid is None:
+            self._cost_grid = np.asarray(self._costs, dtype=np.int32)
+        return self._cost_grid
+
+    def set_costs(self, changes: Dict[Tuple[int, int], int]) -> None:
+        """ Changes the cost of some tiles while the game is running
+
+        Anything that depends on the costs, such as path planners or the
+        minimap, is told which tiles changed so that it can update just
+        those tiles rather than starting again.
+
+        Args:
+            changes (Dict[Tuple[int,int], int]): The new cost for each tile
+        """
+        for (x, y), cost in changes.items():
+            self._costs[y][x] = cost
+            if self._cost_grid is not None:
+                self._cost_grid[y, x] = cost
+
+        tiles = list(changes)
+        for listener in list(self.cost_listeners):
+            listener(tiles)
+
+    def add_cost_listener(self, listener: Callable[[List[Tuple[int, int]]], None]) -> None:
+        """ Registers a function to call with the tiles changed by set_costs """
+        self.cost_listeners.append(listener)
+
+    def remove_cost_listener(self, listener: Callable[[List[Tuple[int, int]]], None]) -> None:
+        """ Stops calling a function registered with add_cost_listener """
+        self.cost_listeners.remove(listener)
 
     def inverse(self, mouse_pos: Tuple[int, int]) -> Tuple[int, int]:
         """ Translate screen co-ordinates need to world space
@@ -23,13 +94,136 @@ class GameMap:
         The mouse's position is always reported in screen space. However,
         the world is larger than the screen, so we need to convert the
         screen position in to world-space to allow game logic to function
-        correctly.
+        correctly. The current zoom level is taken in to account.
 
         Args:
             mouse_pos (pygame.event.pos): The mouse's position on screen
         """
-        # currently doesn't support zoom
-        return self.map.view_rect.x + mouse_pos[0], self.map.view_rect.y + mouse_pos[1]
+        view = self.view_rect()
+        return int(view.x + mouse_pos[0] / self.zoom), int(view.y + mouse_pos[1] / self.zoom)
+
+    def screen(self, world_space: pygame.Vector2) -> Tuple[int, int]:
+        """ Translate world space co-ordinates to screen space
+
+        The opposite of inverse, useful for drawing on top of the map.
+
+        Args:
+            world_space (pygame.Vector2): The world-space position to convert
+        """
+        view = self.view_rect()
+        return int((world_space[0] - view.x) * self.zoom), int((world_space[1] - view.y) * self.zoom)
+
+    def view_rect(self) -> pygame.Rect:
+        """ The area of the world currently on screen, in world space """
+        if self.zoom < 1:
+            return self.view
+        return self.map.view_rect
+
+    def set_zoom(self, zoom: float) -> None:
+        """ Changes the camera's zoom level
+
+        Zooming in is handled by pyscroll, which renders a smaller view
+        and scales it up. Zooming out is drawn by draw_zoomed from a
+        scaled copy of the tile layers, so pyscroll is left at 1:1.
+
+        Args:
+            zoom (float): The new zoom, one of ZOOM_LEVELS
+        """
+        self.zoom = zoom
+        self.map.zoom = max(zoom, 1.0)
+        self.zoomed_sprites.clear()
+
+    def step_zoom(self, steps: int) -> None:
+        """ Moves up or down the ZOOM_LEVELS
+
+        Args:
+            steps (int): How many levels to zoom in by, negative zooms out
+        """
+        index = ZOOM_LEVELS.index(self.zoom) + steps
+        self.set_zoom(ZOOM_LEVELS[max(0, min(index, len(ZOOM_LEVELS) - 1))])
+
+    def zoomed_layer(self, zoom: float) -> pygame.Surface:
+        """ Returns the whole map's tile layers scaled by zoom
+
+        The layer is built the first time a zoom level is used and
+        cached from then on. Each distinct tile image is only scaled
+        once while building it.
+
+        Args:
+            zoom (float): The zoom level to scale to
+        """
+        layer = self.zoom_layers.get(zoom)
+        if layer is not None:
+            return layer
+
+        # the map has loaded by now, so this doesn't slow down launching
+        from pytmx import pytmx
+
+        tmx = self.map.data.tmx
+        tile_w = max(1, round(self.tile_w * zoom))
+        tile_h = max(1, round(self.tile_h * zoom))
+
+        layer = pygame.Surface((tmx.width * tile_w, tmx.height * tile_h))
+        layer.fill(self.background)
+
+        scaled = {}
+        for tile_layer in tmx.visible_layers:
+            if not isinstance(tile_layer, pytmx.TiledTileLayer):
+                continue
+
+            for x, y, image in tile_layer.tiles():
+                small = scaled.get(id(image))
+                if small is None:
+                    size = (max(1, round(image.get_width() * zoom)), max(1, round(image.get_height() * zoom)))
+                    small = pygame.transform.smoothscale(image, size)
+                    scaled[id(image)] = small
+
+                # oversized tiles are anchored to the bottom of their cell
+                layer.blit(small, (x * tile_w, y * tile_h + tile_h - small.get_height()))
+
+        self.zoom_layers[zoom] = layer
+        return layer
+
+    def center(self, world_space: Tuple[int, int], screen_size: Tuple[int, int]) -> None:
+        """ Centres the zoomed out view on a world-space position
+
+        Args:
+            world_space (Tuple[int,int]): The position to centre on
+            screen_size (Tuple[int,int]): The size of the window
+        """
+        map_rect = self.map.map_rect
+        self.view.size = (int(screen_size[0] / self.zoom), int(screen_size[1] / self.zoom))
+        self.view.center = world_space
+        self.view.x = max(0, min(self.view.x, map_rect.w - self.view.w))
+        self.view.y = max(0, min(self.view.y, map_rect.h - self.view.h))
+
+    def draw_zoomed(self, surface: pygame.Surface, sprites: List[pygame.sprite.Sprite]) -> None:
+        """ Draws the zoomed out map and sprites
+
+        The visible part of the cached layer is copied to the screen,
+        so no tiles are scaled per frame. Sprites are scaled down and
+        kept until their image changes.
+
+        Args:
+            surface (pygame.Surface): The window to render to
+            sprites (List[pygame.sprite.Sprite]): The sprites to draw in order
+        """
+        zoom = self.zoom
+        layer = self.zoomed_layer(zoom)
+        area = pygame.Rect(int(self.view.x * zoom), int(self.view.y * zoom), *surface.get_size())
+
+        surface.fill(self.background)
+        surface.blit(layer, (0, 0), area)
+
+        for sprite in sprites:
+            cached = self.zoomed_sprites.get(sprite)
+            if cached is None or cached[0] is not sprite.image:
+                width, height = sprite.image.get_size()
+                size = (max(1, int(width * zoom)), max(1, int(height * zoom)))
+                cached = (sprite.image, pygame.transform.smoothscale(sprite.image, size))
+                self.zoomed_sprites[sprite] = cached
+
+            surface.blit(cached[1], self.screen(sprite.rect.topleft))
 
     def tile(self, world_space: pygame.Vector2) -> Tuple[int, int]:
         """ Translate world space co-ordinates to tile location
@@ -41,8 +235,7 @@ class GameMap:
         Args:
             world_space (pygame.Vector2): The world-space position to convert
         """
-        tile_size = self.map.data.tile_size
-        return int(world_space[0] / tile_size[0]), int(world_space[1] / tile_size[1])
+        return int(world_space[0] / self.tile_w), int(world_space[1] / self.tile_h)
 
     def world(self, tile_xy: Tuple[int, int]) -> pygame.Vector2:
         """ Translate tile location to world space
@@ -54,13 +247,105 @@ class GameMap:
         Args:
             tile_xy (Tuple[int,int]):The tile location to convert
         """
-        tile_size = self.map.data.tile_size
-
         return pygame.Vector2(
-            ((tile_xy[0] + 1) * tile_size[0]) - (tile_size[0] * 0.5),
-            ((tile_xy[1] + 1) * tile_size[1]) - (tile_size[1] * 0.5))
+            ((tile_xy[0] + 1) * self.tile_w) - (self.tile_w * 0.5),
+            ((tile_xy[1] + 1) * self.tile_h) - (self.tile_h * 0.5))
 
     def cost(self, world_space: pygame.Vector2):
         tilespace = self.tile(world_space)
         tile_cost = self.costs[tilespace[1]][tilespace[0]]
         return tile_cost
+
+    def tiles(self, world_space) -> np.ndarray:
+        """ Translate many world space co-ordinates to tile locations at once
+
+        The batched version of tile, useful when converting the positions
+        of lots of ships or cannon balls every tick.
+
+        Args:
+            world_space (array_like): An (N, 2) array of world-space positions
+        """
+        points = np.asarray(world_space, dtype=np.float64).reshape(-1, 2)
+        return (points / (self.tile_w, self.tile_h)).astype(np.intp)
+
+    def worlds(self, tile_xy) -> np.ndarray:
+        """ Translate many tile locations to world space at once
+
+        The batched version of world, each position is the middle of
+        its tile.
+
+        Args:
+            tile_xy (array_like): An (N, 2) array of tile locations
+        """
+        tiles = np.asarray(tile_xy, dtype=np.float64).reshape(-1, 2)
+        return (tiles + 0.5) * (self.tile_w, self.tile_h)
+
+    def costs_at(self, world_space) -> np.ndarray:
+        """ Looks up the cost of many world space positions at once
+
+        The batched version of cost.
+
+        Args:
+            world_space (array_like): An (N, 2) array of world-space positions
+        """
+        tiles = self.tiles(world_space)
+        return self.cost_grid()[tiles[:, 1], tiles[:, 0]]
+
+    def line_of_sight(self, start: Tuple[int, int], end: Tuple[int, int], max_cost: int = 100) -> bool:
+        """ Checks whether a ship can sail in a straight line between two tiles
+
+        Walks every tile the line between the two tile centres passes
+        through, including both tiles when it cuts exactly through a
+        corner. The line is blocked if any of those tiles costs more
+        than max_cost or if it crosses one of the island rectangles.
+
+        Args:
+            start (Tuple[int,int]): The tile to start from
+            end (Tuple[int,int]): The tile to look at
+            max_cost (int): The most expensive tile the line may cross
+        """
+        width = len(self.costs[0])
+        height = len(self.costs)
+
+        def blocked(tile_x: int, tile_y: int) -> bool:
+            # tiles off the map block the line rather than wrapping around
+            if not (0 <= tile_x < width and 0 <= tile_y < height):
+                return True
+            return self.costs[tile_y][tile_x] > max_cost
+
+        x, y = start
+        dx = abs(end[0] - x)
+        dy = abs(end[1] - y)
+        step_x = 1 if end[0] > x else -1
+        step_y = 1 if end[1] > y else -1
+        error = dx - dy
+        dx *= 2
+        dy *= 2
+
+        while True:
+            if blocked(x, y):
+                return False
+            if x == end[0] and y == end[1]:
+                break
+
+            if error > 0:
+                x += step_x
+                error -= dy
+            elif error < 0:
+                y += step_y
+                error += dx
+            else:
+                # passing through a corner, both neighbours must be clear
+                if blocked(x + step_x, y) or blocked(x, y + step_y):
+                    return False
+                x += step_x
+                y += step_y
+                error += dx - dy
+
+        from_world = self.world(start)
+        to_world = self.world(end)
+        for island in self.islands:
+            if island.clipline(from_world, to_world):
+                return False
+
+        return True
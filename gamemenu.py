@@ -4,6 +4,9 @@ from gamestate import GameState
 from gamestate import GameStateID
 from gamedata import GameData
 from enum import Enum
+from typing import List, Optional
+
+LOADING_BAR = pygame.Rect(300, 650, 600, 12)   # shown while the map loads
 
 
 class MenuID(Enum):
@@ -23,6 +26,17 @@ class GameMenu(GameState):
         self.new_game_option = "Start new game"
         self.quit_game_option = "Quit game"
 
+        # the menu lines for each selection, rendered once
+        self.lines = {}
+        self.drawn_selection = None
+        self.drawn_loading = None
+
+    def reset(self) -> None:
+        """ Clears the previous selection """
+        self.menu_id = MenuID.START_MENU
+        self.new_game_selected = True
+        self.full_redraw = True
+
     def input(self, event: pygame.event) -> None:
         """ Handles the user input to select menu items """
         if event.type == pygame.KEYDOWN and (event.key == pygame.K_UP or event.key == pygame.K_DOWN):
@@ -39,23 +53,74 @@ class GameMenu(GameState):
         if self.menu_id is MenuID.START_MENU:
             return GameStateID.START_MENU
         elif self.menu_id is MenuID.START_GAME:
+            # the game starts as soon as the map has finished loading
+            if not self.gamedata.loaded.is_set():
+                return GameStateID.START_MENU
             self.menu_id = MenuID.START_MENU
             return GameStateID.GAMEPLAY
         elif self.menu_id is MenuID.QUIT:
             self.menu_id = MenuID.START_MENU
             return GameStateID.EXIT
 
-    def render(self, screen: pygame.Surface) -> None:
-        """ Use pygame to draw the menu """
-        screen.fill((0, 0, 0))
+    def menu_lines(self, new_game_selected: bool):
+        """ The rendered menu lines for a selection, cached after the first call """
+        if new_game_selected not in self.lines:
+            font = self.gamedata.fonts["menu"]
+            if new_game_selected:
+                new_game = font.render(f'> {self.new_game_option}', True, (200, 200, 200))
+                quit_game = font.render(f'   {self.quit_game_option}', True, (200, 200, 200))
+            else:
+                new_game = font.render(f'   {self.new_game_option}', True, (200, 200, 200))
+                quit_game = font.render(f'> {self.quit_game_option}', True, (200, 200, 200))
+            self.lines[new_game_selected] = ((new_game, (300, 325)), (quit_game, (300, 475)))
+        return self.lines[new_game_selected]
+
+    def loading(self):
+        """ How far the map has loaded, or None once it has """
+        if self.gamedata.loaded.is_set():
+            return None
+        return round(self.gamedata.load_progress, 2)
+
+    def render_loading(self, screen: pygame.Surface) -> pygame.Rect:
+        """ Draws the loading bar, or clears it once the map has loaded """
+        self.drawn_loading = self.loading()
+        screen.fill((0, 0, 0), LOADING_BAR)
+        if self.drawn_loading is not None:
+            pygame.draw.rect(screen, (200, 200, 200), LOADING_BAR, 1)
+            filled = LOADING_BAR.inflate(-4, -4)
+            filled.w = int(filled.w * self.drawn_loading)
+            screen.fill((200, 200, 200), filled)
+        return LOADING_BAR.copy()
+
+    def render(self, screen: pygame.Surface) -> Optional[List[pygame.Rect]]:
+        """ Use pygame to draw the menu
+
+        The menu is only drawn when the selection changes, then just the
+        two lines are cleared and drawn again. While the map is loading
+        the loading bar is drawn whenever it moves.
+        """
+        if self.full_redraw:
+            screen.fill((0, 0, 0))
+            for surface, position in self.menu_lines(self.new_game_selected):
+                screen.blit(surface, position)
+            self.render_loading(screen)
+            self.full_redraw = False
+            self.drawn_selection = self.new_game_selected
+            return None
+
+        dirty = []
+        if self.drawn_loading != self.loading():
+            dirty.append(self.render_loading(screen))
 
-        if self.new_game_selected:
-            new_game = self.gamedata.fonts["menu"].render(f'> {self.new_game_option}', True, (200, 200, 200))
-            quit_game = self.gamedata.fonts["menu"].render(f'   {self.quit_game_option}', True, (200, 200, 200))
-        else:
-            new_game = self.gamedata.fonts["menu"].render(f'   {self.new_game_option}', True, (200, 200, 200))
-            quit_game = self.gamedata.fonts["menu"].render(f'> {self.quit_game_option}', True, (200, 200, 200))
+        if self.drawn_selection == self.new_game_selected:
+            return dirty
 
-        screen.blit(new_game, (300, 325))
-        screen.blit(quit_game, (300, 475))
+        old_lines = self.menu_lines(self.drawn_selection)
+        for (surface, position), (old, _) in zip(self.menu_lines(self.new_game_selected), old_lines):
+            rect = surface.get_rect(topleft=position).union(old.get_rect(topleft=position))
+            screen.fill((0, 0, 0), rect)
+            screen.blit(surface, position)
+            dirty.append(rect)
+        self.drawn_selection = self.new_game_selected
+        return dirty
 
@@ -1,3 +1,5 @@
+from typing import List, Optional
+
 import pygame
 
 from gamedata import GameData
@@ -12,6 +14,12 @@ class GameOver(GameState):
         self.user_clicked = False
         self.lost_message = "Your ship has sunk, you lost!"
         self.back_to_menu = "Click to return to the main menu"
+        self.messages = None
+
+    def reset(self) -> None:
+        """ Clears any click left over from last time """
+        self.user_clicked = False
+        self.full_redraw = True
 
     def input(self, event: pygame.event) -> None:
         """ Checks to see if user clicks button and set user_clicked """
@@ -26,10 +34,21 @@ class GameOver(GameState):
         else:
             return GameStateID.GAME_OVER
 
-    def render(self, screen: pygame.Surface) -> None:
-        """ Renders the game won message / assets """
-        win_msg = self.gamedata.fonts["menu"].render(f'{self.lost_message}', True, (0, 0, 0))
-        return_msg = self.gamedata.fonts["debug"].render(f'{self.back_to_menu}', True, (0, 0, 0))
+    def render(self, screen: pygame.Surface) -> Optional[List[pygame.Rect]]:
+        """ Renders the game won message / assets
+
+        The messages never change, so they are only drawn when the
+        screen needs a full redraw.
+        """
+        if not self.full_redraw:
+            return []
+
+        if self.messages is None:
+            win_msg = self.gamedata.fonts["menu"].render(f'{self.lost_message}', True, (0, 0, 0))
+            return_msg = self.gamedata.fonts["debug"].render(f'{self.back_to_menu}', True, (0, 0, 0))
+            self.messages = ((win_msg, (100, 325)), (return_msg, (500, 470)))
 
-        screen.blit(win_msg, (100, 325))
-        screen.blit(return_msg, (500, 470))
+        for surface, position in self.messages:
+            screen.blit(surface, position)
+        self.full_redraw = False
+        return None
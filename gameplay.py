@@ -1,17 +1,27 @@
 from random import randrange
-from typing import Tuple
-from queue import PriorityQueue
 
 import pygame
 import pyscroll
 
+from aischeduler import AIScheduler
 from cannonball import CannonBall
+from dstarlite import DStarLite
 from enemy import Enemy
+from fleet import Fleet
 from gamedata import GameData
 from gamestate import GameState
 from gamestate import GameStateID
-from math import sqrt
+from influencemap import InfluenceMap
+from instrument import tracer
+from memoryreport import memory
 from player import Player, ShipCondition
+from shipstore import ShipStore
+from spatialgrid import SpatialGrid
+import snapshot
+
+WRECK_COST = 1000    # the cost of a tile with a sunk ship in it
+ESCORTS = 2          # ships sailing with the player's flagship
+QUICKSAVE_FILE = "quicksave.sav"
 
 
 class GamePlay(GameState):
@@ -40,15 +50,54 @@ class GamePlay(GameState):
         self.debug = True
 
         # gameplay Specific Data
-        self.player = Player()
+        self.ships = ShipStore()
+        self.player = Player(self.ships)
+        self.escorts = [Player(self.ships) for _ in range(ESCORTS)]
+        self.planners = {}      # ship -> DStarLite
+        self.fleet = Fleet(self.gamedata.gamemap, self.ships, self.planners)
+        for ship in [self.player] + self.escorts:
+            self.fleet.add(ship)
         self.group = None
         self.cannonballs = []
         self.enemies = []
+        self.wrecks = {}        # tile -> cost before a ship sank there
+        self.scheduler = AIScheduler(self.gamedata.ai_budget)
+        self.island_grid = SpatialGrid()
+        self.ship_grid = SpatialGrid()
 
         # helper functions
         self.loadMap()
         self.loadPlayer()
 
+    def reset(self) -> None:
+        """ Returns the game world to a "clean" state without rebuilding it
+
+        Reuses the existing map group, sprites and surfaces. Cannon balls
+        are cleared, the enemies are repaired and moved to new random
+        locations and the player is restored to the starting position.
+        """
+        for cannonball in self.cannonballs:
+            self.group.remove(cannonball)
+        self.cannonballs.clear()
+        self.influence.clear()
+
+        for planner in self.planners.values():
+            planner.release()
+        self.planners.clear()
+
+        if self.wrecks:
+            self.gamedata.gamemap.set_costs(self.wrecks)
+            self.wrecks.clear()
+
+        for enemy in self.enemies:
+            enemy.reset()
+            self.spawnEnemy(enemy)
+        self.scheduleEnemies()
+
+        self.player.reset()
+        self.fleet.reset()
+        self.loadPlayer()
+
     def input(self, event: pygame.event) -> None:
         """ Handles the player's input
 
@@ -65,11 +114,31 @@ class GamePlay(GameState):
         if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
             self.player.mouse_down = True
 
-            start_tile = self.gamedata.gamemap.tile(self.player.position)
-            end_tile = self.gamedata.gamemap.tile(self.gamedata.gamemap.inverse(event.pos))
+            # ctrl clicking one of our ships adds it to or removes it from the fleet's selection
+            if pygame.key.get_mods() & pygame.KMOD_CTRL:
+                ship = self.fleet.ship_at(self.gamedata.gamemap.inverse(event.pos))
+                if ship is not None:
+                    self.fleet.toggle(ship)
+                return
+
+            # the selected ships sail together, led by the first of them
+            leader = self.fleet.leader
+            if leader is None:
+                return
+
+            start_tile = self.gamedata.gamemap.tile(leader.position)
+
+            # clicking the minimap sails to the tile under the cursor
+            end_tile = self.gamedata.minimap.tile_at(event.pos)
+            if end_tile is None:
+                # zoomed out the map can be smaller than the window, ignore clicks off it
+                to_world = self.gamedata.gamemap.inverse(event.pos)
+                if not self.gamedata.gamemap.map.map_rect.collidepoint(to_world):
+                    return
+                end_tile = self.gamedata.gamemap.tile(to_world)
 
-            if start_tile != end_tile and self.gamedata.gamemap.cost(self.gamedata.gamemap.inverse(event.pos)) < 100:
-                self.player.path = self.pathfinder(self.gamedata.gamemap.costs, start_tile, end_tile)
+            if start_tile != end_tile and self.gamedata.gamemap.costs[end_tile[1]][end_tile[0]] < 100:
+                self.plan(leader, end_tile)
 
         # has player right clicked?
         elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 3:
@@ -82,6 +151,34 @@ class GamePlay(GameState):
         elif event.type == pygame.MOUSEBUTTONUP and event.button == 1:
             self.player.mouse_down = False
 
+        # zoom the camera with the mouse wheel or the +/- keys
+        elif event.type == pygame.MOUSEWHEEL:
+            self.gamedata.gamemap.step_zoom(1 if event.y > 0 else -1)
+
+        elif event.type == pygame.KEYDOWN and event.key in (pygame.K_EQUALS, pygame.K_PLUS, pygame.K_KP_PLUS):
+            self.gamedata.gamemap.step_zoom(1)
+
+        elif event.type == pygame.KEYDOWN and event.key in (pygame.K_MINUS, pygame.K_KP_MINUS):
+            self.gamedata.gamemap.step_zoom(-1)
+
+        # select the whole fleet, or just the flagship, if a key is pressed
+        elif event.type == pygame.KEYDOWN and event.key == pygame.K_a:
+            self.fleet.select_all()
+
+        # quick save and quick load
+        elif event.type == pygame.KEYDOWN and event.key == pygame.K_F5:
+            snapshot.save(self, QUICKSAVE_FILE)
+
+        elif event.type == pygame.KEYDOWN and event.key == pygame.K_F9:
+            try:
+                snapshot.load(self, QUICKSAVE_FILE)
+            except (OSError, ValueError) as error:
+                print(f'unable to load {QUICKSAVE_FILE}: {error}')
+
+        # print where the memory is going
+        elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+            print(memory.report(self.gamedata, self))
+
         # toggle debug mode if d key is pressed
         elif event.type == pygame.KEYDOWN and event.key == pygame.K_d:
             self.debug = not self.debug
@@ -101,16 +198,37 @@ class GamePlay(GameState):
         """ Loads the map and spawns enemies
         """
         self.group = pyscroll.PyscrollGroup(map_layer=self.gamedata.gamemap.map, default_layer=4)
+        self.influence = InfluenceMap(self.gamedata.gamemap)
+        self.gamedata.gamemap.add_cost_listener(self.influence.update_tiles)
 
-        while len(self.enemies) != 3:
-            enemy = Enemy()
-
-            while enemy.rect.collidelist(self.gamedata.gamemap.islands) != -1:
-                enemy.rect.x = randrange(0, self.gamedata.gamemap.map.map_rect.w - enemy.rect.width)
-                enemy.rect.y = randrange(0, self.gamedata.gamemap.map.map_rect.h - enemy.rect.height)
+        for island in self.gamedata.gamemap.islands:
+            self.island_grid.insert(island, island)
 
+        while len(self.enemies) != 3:
+            enemy = Enemy(self.ships)
+            enemy.influence = self.influence
+            self.spawnEnemy(enemy)
             self.enemies.append(enemy)
             self.group.add(enemy)
+        self.scheduleEnemies()
+
+    def scheduleEnemies(self) -> None:
+        """ Gives every enemy that is still afloat a think task
+        """
+        self.scheduler.clear()
+        for enemy in self.enemies:
+            if enemy.ship_condition is not ShipCondition.SUNK:
+                self.scheduler.add(enemy, enemy.think)
+
+    def spawnEnemy(self, enemy: Enemy) -> None:
+        """ Moves the enemy to a random location away from the islands
+        """
+        while enemy.rect.collidelist(self.gamedata.gamemap.islands) != -1:
+            enemy.rect.x = randrange(0, self.gamedata.gamemap.map.map_rect.w - enemy.rect.width)
+            enemy.rect.y = randrange(0, self.gamedata.gamemap.map.map_rect.h - enemy.rect.height)
+
+        enemy.position = enemy.rect.topleft
+        enemy.destination = enemy.position
 
     def loadPlayer(self) -> None:
         """ Loads the player and sets initial position
@@ -120,6 +238,15 @@ class GamePlay(GameState):
         self.player.update(0)
         self.group.add(self.player)
 
+        # the escorts start in formation behind the flagship
+        x, y = self.player.position
+        for escort, slot in zip(self.escorts, self.fleet.slots(len(self.escorts))):
+            escort.reset()
+            escort.position = self.fleet.formation((x, y + 1), [(x, y)], slot)[0]
+            escort.destination = escort.position
+            escort.update(0)
+            self.group.add(escort)
+
     def update(self, dt: float) -> GameStateID:
         """ Updates the game world
 
@@ -138,42 +265,94 @@ class GamePlay(GameState):
             self.player.hp = 10
             return GameStateID.GAME_OVER
 
-        self.resolveCannonballs()
+        with tracer.span("GamePlay.resolveCannonballs"):
+            self.resolveCannonballs()
+        tracer.counter("cannonballs", alive=len(self.cannonballs))
         # self.resolvePlayerCollisions(dt)
+        self.replan()
+        self.ships.step_all()
+        self.fleet.separate()
+        self.updateInfluence()
         self.group.update(dt)
+        with tracer.span("GamePlay.think"):
+            self.think()
+        tracer.counter("ai", ran=self.scheduler.ran, deferred=self.scheduler.deferred,
+                       starved=self.scheduler.starved)
 
         return GameStateID.GAMEPLAY
 
+    def updateInfluence(self) -> None:
+        """ Feeds the ship and cannon ball positions to the influence map
+        every UPDATE_INTERVAL ticks
+        """
+        if not self.influence.tick():
+            return
+
+        self.influence.update(
+            [ship.rect.center for ship in self.fleet.ships],
+            [cannonball.rect.center for cannonball in self.cannonballs],
+            [enemy.rect.center for enemy in self.enemies if enemy.ship_condition is not ShipCondition.SUNK])
+
+    def think(self) -> None:
+        """ Lets the enemies think for as long as the AI budget allows
+
+        Enemies on screen think first, then the ones closest to the player.
+        """
+        view = self.gamedata.gamemap.view_rect()
+        centre = pygame.Vector2(self.player.rect.center)
+        self.scheduler.run(lambda enemy: (view.colliderect(enemy.rect), centre.distance_to(enemy.rect.center)))
+
     def resolveCannonballs(self) -> None:
         """ Updates the active cannon balls in the world
 
         Checks to see if the cannon balls have reached their target
-        or collided with a ship. If they hit a ship the ship's hp
-        will drop by 1. This of course can be changed or tweaked.
-        At present if the ship's hp is below 0, the console will
-        print the "dead" message
+        or collided with a ship or an island. If they hit a ship the
+        ship's hp will drop by 1. This of course can be changed or
+        tweaked. At present if the ship's hp is below 0, the console
+        will print the "dead" message
+
+        Each ball is swept along the whole of its last move rather than
+        tested where it ended up, so a fast ball or a long frame can't
+        carry it through a ship or over an island. The islands and ships
+        are bucketed in to grids so only those near the ball are tested.
         """
-        # check to see if canonballs are finished
-        for sprite in self.cannonballs:
+        self.ship_grid.clear()
+        for enemy in self.enemies:
+            self.ship_grid.insert(enemy, enemy.rect)
 
-            # check for collisions
-            for enemy in self.enemies:
-                if enemy.rect.colliderect(sprite.rect):
-                    self.group.remove(sprite)
-                    self.cannonballs.remove(sprite)
-                    if enemy.ship_condition is not ShipCondition.SUNK:
-                        enemy.hp -= 1
-                        print(enemy.hp)
-                        self.player.score = self.player.score + 100
-                        if enemy.hp == 0:
-                            print("dead")
-
-            if sprite.position == sprite.destination:
+        remaining = []
+        for sprite in self.cannonballs:
+            size = sprite.rect.size
+            ship_hit = self.ship_grid.sweep(sprite.previous, sprite.position, size)
+            island_hit = self.island_grid.sweep(sprite.previous, sprite.position, size)
+
+            if ship_hit is not None and (island_hit is None or ship_hit[0] <= island_hit[0]):
+                enemy = ship_hit[1]
+                if enemy.ship_condition is not ShipCondition.SUNK:
+                    enemy.hp -= 1
+                    print(enemy.hp)
+                    self.player.score = self.player.score + 100
+                    if enemy.hp == 0:
+                        print("dead")
+                        self.sink(enemy)
+            elif island_hit is None and sprite.position != sprite.destination:
                 # as lerping reduces distance over time, it might make
                 # more sense to check distance between two vectors and
                 # remove when close "enough"
-                self.group.remove(sprite)
-                self.cannonballs.remove(sprite)
+                remaining.append(sprite)
+                continue
+
+            self.group.remove(sprite)
+
+        self.cannonballs[:] = remaining
+
+    def sink(self, enemy: Enemy) -> None:
+        """ Leaves the wreck of a sunk ship as an obstacle on the map
+        """
+        x, y = self.gamedata.gamemap.tile(enemy.rect.center)
+        self.wrecks.setdefault((x, y), self.gamedata.gamemap.costs[y][x])
+        self.gamedata.gamemap.set_costs({(x, y): WRECK_COST})
+        self.scheduler.remove(enemy)
 
     def resolvePlayerCollisions(self, dt) -> None:
         """Checks for collisions with the islands
@@ -186,11 +365,23 @@ class GamePlay(GameState):
     def render(self, screen: pygame.Surface) -> None:
         """ Renders the map, player and score
         """
-        # center the map/screen on our Hero
-        self.group.center(self.player.rect.center)
-
-        # draw the map and all sprites
-        self.group.draw(screen)
+        # center the map/screen on our Hero and draw the map and all sprites
+        if self.gamedata.gamemap.zoom < 1:
+            self.gamedata.gamemap.center(self.player.rect.center, screen.get_size())
+            self.gamedata.gamemap.draw_zoomed(screen, self.group.sprites())
+        else:
+            self.group.center(self.player.rect.center)
+            with tracer.span("group.draw"):
+                self.group.draw(screen)
+
+        # outline the selected ships
+        zoom = self.gamedata.gamemap.zoom
+        for ship in self.fleet.selected:
+            topleft = self.gamedata.gamemap.screen(ship.rect.topleft)
+            pygame.draw.rect(screen, (255, 255, 0), (topleft, (ship.rect.w * zoom, ship.rect.h * zoom)), 2)
+
+        # minimap
+        self.gamedata.minimap.render(screen, self.minimap_markers())
 
         # score
         textsurface = self.gamedata.fonts["scoreboard"].render(f'{self.player.score:06d}', True, (0, 0, 0))
@@ -199,6 +390,18 @@ class GamePlay(GameState):
         # debug rendering
         self.render_debug(screen)
 
+    def minimap_markers(self):
+        """ The ships and cannon balls to mark on the minimap """
+        markers = [(self.player.rect.center, (255, 255, 0), 3)]
+        for escort in self.escorts:
+            markers.append((escort.rect.center, (255, 255, 0), 2))
+        for enemy in self.enemies:
+            if enemy.ship_condition is not ShipCondition.SUNK:
+                markers.append((enemy.rect.center, (200, 0, 0), 3))
+        for cannonball in self.cannonballs:
+            markers.append((cannonball.rect.center, (0, 0, 0), 1))
+        return markers
+
     def render_debug(self, screen: pygame.Surface) -> None:
         """ Renders the debug information if DEBUG is True
 
@@ -222,83 +425,97 @@ class GamePlay(GameState):
             screen.blit(debug_font.render(f'Cost: {self.gamedata.gamemap.cost(self.player.position)}',
                                           True, (0, 0, 0)), (15, 130))
 
-    def pathfinder(self, cost_map, start, end):
-        frontier = PriorityQueue()
-        frontier.put((0, start))
-        came_from = dict()
-        cost_so_far = dict()
-        came_from[start] = None
-        cost_so_far[start] = 0
-
-        while not frontier.empty():
-            coordinates = frontier.get()[1]
-            current = Node(coordinates[1], coordinates[0])
-            current.update_neighbors(self.gamedata.gamemap.costs)
-
-            if current.get_position() == end:
-                break
-
-            for next in current.neighbors:
-                new_cost = cost_so_far[current.get_position()] + cost_map[next.get_position()[1]][
-                    next.get_position()[0]]
-                if next.get_position() not in cost_so_far or new_cost < cost_so_far[next.get_position()]:
-                    cost_so_far[next.get_position()] = new_cost
-                    priority = new_cost + self.heuristics(end, next.get_position())
-                    frontier.put((priority, next.get_position()))
-                    came_from[next.get_position()] = current.get_position()
-
-        return self.reconstruct_path(came_from, start, end)
-
-    def heuristics(self, p1, p2):
-        x1, y1 = p1
-        x2, y2 = p2
-        dx = abs(x1 - x2)
-        dy = abs(y1 - y2)
-        return sqrt(dx * dx + dy * dy)
-
-    def reconstruct_path(self, came_from, start, end):
-        current = end
-        path = []
-        while current != start:
-            path.append(self.gamedata.gamemap.world(current))
-            current = came_from[current]
-        path.reverse()
-        return path
-
-
-class Node:
-    def __init__(self, col, row) -> None:
-        self.x = row
-        self.y = col
-        self.neighbors = []
-        self.WIDTH = 60
-        self.HEIGHT = 34
-
-    def get_position(self) -> Tuple[int, int]:
-        return self.x, self.y
-
-    def update_neighbors(self, grid):
-        self.neighbors = []
-        if self.x < self.WIDTH - 1 and not grid[self.y][self.x + 1] > 100:
-            self.neighbors.append(Node(self.y, self.x + 1))
-
-        if self.x < self.WIDTH - 1 and self.y < self.HEIGHT - 1 and not grid[self.y + 1][self.x + 1] > 100:
-            self.neighbors.append(Node(self.y + 1, self.x + 1))
-
-        if self.y < self.HEIGHT - 1 and not grid[self.y + 1][self.x] > 100:
-            self.neighbors.append(Node(self.y + 1, self.x))
-
-        if self.y < self.HEIGHT - 1 and self.x > 0 and not grid[self.y + 1][self.x - 1] > 100:
-            self.neighbors.append(Node(self.y + 1, self.x - 1))
-
-        if self.x > 0 and not grid[self.y][self.x - 1] > 100:
-            self.neighbors.append(Node(self.y, self.x - 1))
-
-        if self.x > 0 and self.y > 0 and not grid[self.y - 1][self.x - 1] > 100:
-            self.neighbors.append(Node(self.y - 1, self.x - 1))
-
-        if self.y > 0 and not grid[self.y - 1][self.x] > 100:
-            self.neighbors.append(Node(self.y - 1, self.x))
-
-        if self.y > 0 and self.x < self.WIDTH - 1 and not grid[self.y - 1][self.x + 1] > 100:
-            self.neighbors.append(Node(self.y - 1, self.x + 1))
+            screen.blit(debug_font.render(f'AI: {self.scheduler.ran} ran, {self.scheduler.deferred} deferred, '
+                                          f'{self.scheduler.starved} starved', True, (0, 0, 0)), (15, 155))
+
+            screen.blit(debug_font.render(f'{memory.summary(self.gamedata, self)} (F3 for a report)',
+                                          True, (0, 0, 0)), (15, 180))
+
+    def plan(self, ship, end) -> None:
+        """ Plans a route for a ship that is kept up to date as the map changes
+
+        The ship gets its own incremental planner, replacing any older
+        one. Whenever tile costs change, replan repairs the route rather
+        than searching again from scratch.
+
+        Args:
+            ship (Ship): The ship to give orders to
+            end (Tuple[int,int]): The tile to sail to
+        """
+        old_planner = self.planners.pop(ship, None)
+        if old_planner is not None:
+            old_planner.release()
+
+        planner = DStarLite(self.gamedata.gamemap, self.gamedata.gamemap.tile(ship.position), end)
+        with tracer.span("GamePlay.plan"), memory.measure("DStarLite.plan"):
+            tiles = planner.plan()
+
+        if tiles is None:
+            planner.release()
+            return
+
+        self.planners[ship] = planner
+        ship.path = self.follow(tiles)
+        if ship is self.fleet.leader:
+            self.fleet.assign(ship)
+
+    def replan(self) -> None:
+        """ Repairs the routes affected by cost changes and drops finished ones
+        """
+        for ship, planner in list(self.planners.items()):
+            # a ship that has joined a formation since has lost its planner
+            if self.planners.get(ship) is not planner:
+                continue
+
+            if not ship.path and ship.position == ship.destination:
+                planner.release()
+                del self.planners[ship]
+
+            elif planner.changed:
+                with tracer.span("GamePlay.replan"), memory.measure("DStarLite.replan"):
+                    tiles = planner.plan(self.gamedata.gamemap.tile(ship.position))
+
+                if tiles is None:
+                    ship.path = []
+                    planner.release()
+                    del self.planners[ship]
+                else:
+                    ship.path = self.follow(tiles)
+                    if ship is self.fleet.order_leader:
+                        self.fleet.assign(ship, self.fleet.followers)
+
+    def follow(self, tiles):
+        """ Turns a planned list of tiles, starting with the ship's tile, in to waypoints """
+        return self.gamedata.gamemap.worlds(self.smooth_path(tiles)).tolist()
+
+    def smooth_path(self, tiles):
+        """ Removes the waypoints a ship can sail straight past
+
+        Uses string pulling, starting from the first tile it keeps
+        skipping ahead for as long as there is a clear line of sight
+        back to the last kept waypoint. The line may not cross tiles
+        more expensive than the ones the original path crossed, so the
+        smoothed route never cuts through costlier water or land. The
+        start tile is not included in the result.
+
+        Args:
+            tiles (List[Tuple[int,int]]): The tile path including the start
+        """
+        if len(tiles) < 3:
+            return tiles[1:]
+
+        costs = self.gamedata.gamemap.costs
+        smoothed = []
+        anchor = tiles[0]
+        max_cost = max(costs[anchor[1]][anchor[0]], costs[tiles[1][1]][tiles[1][0]])
+
+        for previous, tile in zip(tiles[1:], tiles[2:]):
+            max_cost = max(max_cost, costs[tile[1]][tile[0]])
+            if not self.gamedata.gamemap.line_of_sight(anchor, tile, max_cost):
+                smoothed.append(previous)
+                anchor = previous
+                max_cost = max(costs[previous[1]][previous[0]], costs[tile[1]][tile[0]])
+
+        smoothed.append(tiles[-1])
+        return smoothed
+
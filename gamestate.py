@@ -2,6 +2,7 @@ import pygame
 
 from abc import ABC, abstractmethod
 from enum import Enum
+from typing import List, Optional
 from gamedata import GameData
 
 
@@ -19,6 +20,7 @@ class GameStateID(Enum):
     GAME_OVER = 3
     WINNER_WINNER = 4
     EXIT = 5
+    NETWORK_PLAY = 6
 
 
 class GameState(ABC):
@@ -34,14 +36,31 @@ class GameState(ABC):
         self.id = GameStateID.UNKNOWN
         self.gamedata = data
 
+        # set when the whole screen has to be drawn again, e.g. after a resize
+        self.full_redraw = True
+
     @abstractmethod
     def update(self, dt: float) -> None:
         pass
 
     @abstractmethod
-    def render(self, screen: pygame.Surface) -> None:
+    def render(self, screen: pygame.Surface) -> Optional[List[pygame.Rect]]:
+        """ Draws the state to the screen
+
+        Return None when the whole screen has changed, or the rects that
+        were drawn to so only those are presented. An empty list means
+        nothing changed and the frame isn't presented at all.
+        """
         pass
 
     @abstractmethod
     def input(self, event: pygame.event) -> None:
         pass
+
+    def reset(self) -> None:
+        """ Returns a previously used state to a "clean" state
+
+        States are reused between transitions rather than rebuilt,
+        override this to clear anything left over from last time.
+        """
+        pass
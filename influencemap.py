@@ -0,0 +1,118 @@
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+from gamemap import GameMap
+
+UPDATE_INTERVAL = 10    # ticks between updates
+DECAY = 0.75            # how much old influence is kept each update
+THREAT_RADIUS = 6       # tiles, how far the player is considered a threat
+DANGER_RADIUS = 2       # tiles, how close to a cannon ball is dangerous
+DENSITY_RADIUS = 4      # tiles, how far away ships count as neighbours
+
+
+def box_sum(grid: np.ndarray, radius: int) -> np.ndarray:
+    """ Sums every cell's square neighbourhood of the given radius
+
+    Runs as two passes of running sums, one per axis, so the cost does
+    not depend on the radius.
+
+    Args:
+        grid (np.ndarray): The 2D grid to sum
+        radius (int): The neighbourhood's radius in cells
+    """
+    size = 2 * radius + 1
+    for axis in (0, 1):
+        padding = [(radius + 1, radius) if a == axis else (0, 0) for a in (0, 1)]
+        summed = np.cumsum(np.pad(grid, padding), axis=axis)
+        length = summed.shape[axis]
+        grid = summed.take(range(size, length), axis=axis) - summed.take(range(0, length - size), axis=axis)
+    return grid
+
+
+class InfluenceMap:
+    """ A tile resolution map of where the danger is
+
+    Three layers are kept over the GameMap's cost grid: the threat
+    from the player's ships, the danger from cannon balls and the
+    density of enemy ships. They are rebuilt every few ticks with
+    whole-grid NumPy operations, old influence decays rather than
+    being cleared so it lingers for a while. Reading a tile's values
+    is a constant time lookup for the enemy AI.
+    """
+
+    def __init__(self, gamemap: GameMap) -> None:
+        """ Creates empty layers the size of the cost map
+
+        Args:
+            gamemap (GameMap): The loaded game map
+        """
+        self.gamemap = gamemap
+        self.tile_size = (gamemap.tile_w, gamemap.tile_h)
+        self.ticks = 0
+
+        self.open = (gamemap.cost_grid() <= 100).astype(np.float32)
+        self.threat = np.zeros_like(self.open)
+        self.danger = np.zeros_like(self.open)
+        self.density = np.zeros_like(self.open)
+
+    def update_tiles(self, tiles: List[Tuple[int, int]]) -> None:
+        """ Opens or closes tiles whose cost has changed
+
+        Args:
+            tiles (List[Tuple[int,int]]): The tiles whose cost changed
+        """
+        costs = self.gamemap.costs
+        for x, y in tiles:
+            self.open[y, x] = costs[y][x] <= 100
+
+    def clear(self) -> None:
+        """ Removes all influence """
+        self.ticks = 0
+        self.threat.fill(0)
+        self.danger.fill(0)
+        self.density.fill(0)
+
+    def stamp(self, positions: Sequence[Tuple[float, float]]) -> np.ndarray:
+        """ Counts how many of the world-space positions are in each tile
+
+        Args:
+            positions (Sequence): World-space (x, y) positions
+        """
+        grid = np.zeros_like(self.open)
+        tiles = self.gamemap.tiles(positions)
+        if len(tiles):
+            xs = np.clip(tiles[:, 0], 0, grid.shape[1] - 1)
+            ys = np.clip(tiles[:, 1], 0, grid.shape[0] - 1)
+            np.add.at(grid, (ys, xs), 1)
+        return grid
+
+    def tick(self) -> bool:
+        """ Counts a tick and returns True when the layers are due an update """
+        self.ticks += 1
+        return self.ticks % UPDATE_INTERVAL == 0
+
+    def update(self, players: Sequence, cannonballs: Sequence, enemies: Sequence) -> None:
+        """ Decays the layers and adds the latest influence
+
+        Args:
+            players (Sequence): World-space positions of the player's ships
+            cannonballs (Sequence): World-space positions of the cannon balls
+            enemies (Sequence): World-space positions of the enemy ships
+        """
+        for layer, positions, radius in ((self.threat, players, THREAT_RADIUS),
+                                         (self.danger, cannonballs, DANGER_RADIUS),
+                                         (self.density, enemies, DENSITY_RADIUS)):
+            layer *= DECAY
+            layer += box_sum(self.stamp(positions), radius) * (1 - DECAY)
+            layer *= self.open
+
+    def sample(self, world_space: Tuple[float, float]) -> Tuple[float, float, float]:
+        """ Returns the threat, danger and density at a world-space position
+
+        Args:
+            world_space (Tuple[float,float]): The position to look up
+        """
+        x = min(max(int(world_space[0] // self.tile_size[0]), 0), self.open.shape[1] - 1)
+        y = min(max(int(world_space[1] // self.tile_size[1]), 0), self.open.shape[0] - 1)
+        return float(self.threat[y, x]), float(self.danger[y, x]), float(self.density[y, x])
@@ -0,0 +1,139 @@
+import json
+import os
+import threading
+import time
+
+FLUSH_EVENTS = 1000     # events buffered before they are written to disk
+
+
+class NullSpan:
+    """ The span handed out while tracing is disabled, it does nothing """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        pass
+
+
+class Span:
+    """ Times a block of code and records it as a trace event """
+
+    __slots__ = ("tracer", "name", "begin")
+
+    def __init__(self, tracer, name: str) -> None:
+        self.tracer = tracer
+        self.name = name
+        self.begin = 0.0
+
+    def __enter__(self):
+        self.begin = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        end = time.perf_counter()
+        self.tracer.record({
+            "name": self.name,
+            "ph": "X",
+            "ts": self.tracer.micros(self.begin),
+            "dur": (end - self.begin) * 1e6,
+            "pid": self.tracer.pid,
+            "tid": threading.get_ident(),
+        })
+
+
+class Tracer:
+    """ Records spans and counters in the Chrome trace event format
+
+    The output can be opened in chrome://tracing, Perfetto or any other
+    viewer that understands trace events. Events are streamed to the file
+    in batches using the JSON array form of the format, so long sessions
+    don't build up in memory. When the tracer isn't started, span and
+    counter return immediately.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.file = None
+        self.written = False
+        self.events = []
+        self.pid = os.getpid()
+        self.origin = 0.0
+        self.lock = threading.Lock()
+        self.null_span = NullSpan()
+
+    def start(self, filename: str) -> None:
+        """ Starts recording events to a file
+
+        Args:
+            filename (str): The trace file to write, i.e. trace.json
+        """
+        self.file = open(filename, "w")
+        self.file.write("[\n")
+        self.written = False
+        self.origin = time.perf_counter()
+        self.enabled = True
+
+    def stop(self) -> None:
+        """ Writes any remaining events and closes the file """
+        if not self.enabled:
+            return
+
+        self.enabled = False
+        with self.lock:
+            self.flush()
+            self.file.write("\n]\n")
+            self.file.close()
+            self.file = None
+
+    def micros(self, seconds: float) -> float:
+        """ Converts a perf_counter time to microseconds since the trace started """
+        return (seconds - self.origin) * 1e6
+
+    def span(self, name: str):
+        """ Returns a context manager that times the code inside it
+
+        Args:
+            name (str): The name shown in the trace viewer
+        """
+        if not self.enabled:
+            return self.null_span
+        return Span(self, name)
+
+    def counter(self, name: str, **values) -> None:
+        """ Records the current value of one or more counters
+
+        Args:
+            name (str): The name shown in the trace viewer
+            values: The counter values, i.e. alive=3
+        """
+        if not self.enabled:
+            return
+
+        self.record({
+            "name": name,
+            "ph": "C",
+            "ts": self.micros(time.perf_counter()),
+            "pid": self.pid,
+            "args": values,
+        })
+
+    def record(self, event: dict) -> None:
+        """ Buffers an event, writing the buffer out once it's full """
+        with self.lock:
+            self.events.append(event)
+            if len(self.events) >= FLUSH_EVENTS:
+                self.flush()
+
+    def flush(self) -> None:
+        """ Writes the buffered events to the file """
+        if self.events and self.file is not None:
+            if self.written:
+                self.file.write(",\n")
+            self.file.write(",\n".join(json.dumps(event) for event in self.events))
+            self.written = True
+        self.events.clear()
+
+
+# the tracer shared by the whole game
+tracer = Tracer()
@@ -0,0 +1,9 @@
+from enum import IntEnum
+
+
+class Intent(IntEnum):
+    """ What an enemy ship has decided to do """
+    PATROL = 0
+    CHASE = 1
+    FLANK = 2
+    FLEE = 3
@@ -1,28 +1,31 @@
+# imported first so launch is timed from as early as possible
+from startupprofile import profile, LAUNCHED
+
 # system libraries
+import argparse
+import importlib
 import os
+import time
 from collections import deque
 from pathlib import Path
 
-# pygame and tile map
+# pygame, the tile map libraries are imported when the map is loaded
 import pygame
-import pyscroll
-import pyscroll.data
-from pygame.locals import VIDEORESIZE
-
-# https://github.com/bitcraft/pytmx
-from pytmx import pytmx
-from pytmx.util_pygame import load_pygame
+from pygame.locals import VIDEOEXPOSE, VIDEORESIZE
 
-# user defined ones
-from gameplay import GamePlay
+# user defined ones, states other than the menu are imported when first used
 from gamestate import GameStateID
 from gamemenu import GameMenu
 from gamedata import GameData
-from gamewon import GameWon
-from gameover import GameOver
+from instrument import tracer
+from memoryreport import memory
+from minimap import Minimap
+from statemanager import StateManager
 
 # define configuration variables here
 CURRENT_DIR = Path(__file__).parent
+CRASH_FILE = "crash.sav"
+IDLE_FPS = 30       # frame rate cap while nothing on screen is changing
 RESOURCES_DIR = CURRENT_DIR / "data"
 
 
@@ -36,6 +39,20 @@ def getPath(filename):
     return os.path.join(RESOURCES_DIR, filename)
 
 
+def lazyState(module: str, name: str):
+    """ A state factory that only imports the state's module when it's built
+
+    Args:
+        module (str): The module the state is defined in, i.e. "gameplay"
+        name (str): The state's class, i.e. "GamePlay"
+    """
+    def build(data: GameData):
+        with profile.stage(f"import {module}"):
+            state = getattr(importlib.import_module(module), name)
+        return state(data)
+    return build
+
+
 class PirateGame:
     """ This class is your most excellent Pirate game.
 
@@ -45,54 +62,87 @@ class PirateGame:
     will be used to render the sprites.. see GamePlay
     """
 
-    def __init__(self) -> None:
+    def __init__(self, headless: bool = False) -> None:
         """ Initialise the game here
 
         Sets sane values for the game and creates the window size.
         I've gone for a typical 16:9 aspect ratio here. Remember
         to use functions when initialising more complex data structures
         i.e. audio or the map
+
+        Args:
+            headless (bool): Skip the audio, i.e. when running as a server
         """
         self.width = 1920
         self.height = 1080
         self.costs = None
         self.gamedata = GameData()
-        self.gamedata.fonts['scoreboard'] = pygame.font.Font('data/fonts/ErbosDraco1StNbpRegular-99V5.ttf', 72)
-        self.gamedata.fonts['menu'] = pygame.font.Font(pygame.font.get_default_font(), 128)
-        self.gamedata.fonts['debug'] = pygame.font.Font(pygame.font.get_default_font(), 18)
-        self.screen = initScreen(self.width, self.height)
+        with profile.stage("create window"):
+            self.screen = initScreen(self.width, self.height)
         self.background_colour = (100, 149, 237)
         self.screen.fill(self.background_colour)
-        self.initAudio()
-        self.loadMap()
-        self.current_state = GameMenu(self.gamedata)
+        if not headless:
+            self.initAudio()
+        self.states = StateManager(self.gamedata, {
+            GameStateID.START_MENU: GameMenu,
+            GameStateID.GAMEPLAY: lazyState("gameplay", "GamePlay"),
+            GameStateID.GAME_OVER: lazyState("gameover", "GameOver"),
+            GameStateID.WINNER_WINNER: lazyState("gamewon", "GameWon"),
+        })
+
+        # the map loads behind the menu, before any state that needs it is preloaded
+        self.loading = self.states.submit(self.loadMap, self.screen.get_size())
+        self.current_state = self.states.get(GameStateID.START_MENU)
         self.running = False
 
+    def waitLoaded(self) -> None:
+        """ Blocks until the map has loaded, raising any error it hit
+
+        The renderer was built for the window size when loading began,
+        so a resize while loading is applied here, on the main thread.
+        """
+        if self.loading is not None:
+            self.loading.result()
+            self.loading = None
+
+            renderer = self.gamedata.gamemap.map
+            if renderer.view_rect.size != self.screen.get_size():
+                renderer.set_size(self.screen.get_size())
+
     def initAudio(self) -> None:
         """ Initialises the audio
 
-        At present only background audio has been provided,
-        but you could choose to load additional sound effects
-        and store them as part of the game data
+        The background music is streamed from disk on a loader thread
+        so it doesn't delay the first frame. Sound effects can be
+        preloaded with self.gamedata.audio.preload and played by name.
         """
-        print('init =', pygame.mixer.get_init())
-        print('channels =', pygame.mixer.get_num_channels())
-        self.gamedata.background_audio = pygame.mixer.Sound('data/audio/ambient.wav')
-        self.gamedata.background_audio.play(-1)
-        self.gamedata.background_audio.set_volume(self.gamedata.background_volume)
-        print('length =', self.gamedata.background_audio.get_length())
-
-    def loadMap(self) -> None:
+        with profile.stage("start audio"):
+            self.gamedata.audio.play_music()
+
+    def loadMap(self, screen_size) -> None:
         """ Loads the tiled map
 
         In order for your A* pathfinding to work you will need to
         store the weights associated with the tiles. You can do this
         programmatically or via properties using the editor. Load
         the weights here though.
+
+        Runs on the StateManager's loading thread while the menu is
+        shown, reporting its progress in gamedata.load_progress.
+
+        Args:
+            screen_size (Tuple[int,int]): The size of the window to render to
         """
+        with profile.stage("import pyscroll, pytmx"):
+            import pyscroll
+            from pytmx import pytmx
+            from pytmx.util_pygame import load_pygame
+
         # loads the map data
-        tmx_data = load_pygame("./data/worldmap.tmx")
-        map_data = pyscroll.TiledMapData(tmx_data)
+        with profile.stage("load worldmap.tmx"):
+            tmx_data = load_pygame("./data/worldmap.tmx")
+            map_data = pyscroll.TiledMapData(tmx_data)
+        self.gamedata.load_progress = 0.5
 
         # the map stores collision rects with the islands
         for obj in tmx_data.objects:
@@ -111,8 +161,19 @@ class PirateGame:
                 for x, y, _ in layer.tiles():
                     self.gamedata.gamemap.costs[y][x] += cost
 
+        self.gamedata.load_progress = 0.6
+
         # Make the scrolling layer
-        self.gamedata.gamemap.map = pyscroll.BufferedRenderer(map_data, self.screen.get_size())
+        with profile.stage("build map renderer"):
+            self.gamedata.gamemap.map = pyscroll.BufferedRenderer(map_data, screen_size)
+        self.gamedata.load_progress = 0.9
+
+        # the minimap is drawn from the costs once, here
+        with profile.stage("draw minimap"):
+            self.gamedata.minimap = Minimap(self.gamedata.gamemap)
+            self.gamedata.gamemap.add_cost_listener(self.gamedata.minimap.update_tiles)
+        self.gamedata.load_progress = 1.0
+        self.gamedata.loaded.set()
 
     def input_handler(self, event) -> None:
         """ Handles input events sent by pygame
@@ -127,8 +188,7 @@ class PirateGame:
 
         # mute background audio
         if event.type == pygame.KEYDOWN and event.key == pygame.K_m:
-            print(self.gamedata.background_audio.get_volume())
-            self.gamedata.background_audio.set_volume(self.gamedata.background_volume - self.gamedata.background_audio.get_volume())
+            self.gamedata.audio.toggle_mute()
             return
 
         # exit game
@@ -156,7 +216,8 @@ class PirateGame:
             elif (
                 event.type == pygame.MOUSEBUTTONDOWN or
                 event.type == pygame.MOUSEBUTTONUP or
-                event.type == pygame.MOUSEMOTION
+                event.type == pygame.MOUSEMOTION or
+                event.type == pygame.MOUSEWHEEL
             ):
                 self.input_handler(event)
 
@@ -165,27 +226,53 @@ class PirateGame:
 
             elif event.type == VIDEORESIZE:
                 self.screen = initScreen(event.w, event.h)
-                self.gamedata.gamemap.map.set_size((event.w, event.h))
+                if self.gamedata.loaded.is_set():
+                    self.gamedata.gamemap.map.set_size((event.w, event.h))
+                self.current_state.full_redraw = True
+
+            elif event.type == VIDEOEXPOSE:
+                self.current_state.full_redraw = True
+
+        # surface any error from loading the map once it has finished
+        if self.loading is not None and self.loading.done():
+            self.waitLoaded()
 
         # delegate the update logic to the active state
         new_state = self.current_state.update(dt)
         if self.current_state.id != new_state:
-            if new_state is GameStateID.START_MENU:
-                self.current_state = GameMenu(self.gamedata)
-            elif new_state is GameStateID.GAMEPLAY:
-                self.current_state = GamePlay(self.gamedata)
-            elif new_state is GameStateID.GAME_OVER:
-                self.current_state = GameOver(self.gamedata)
-            elif new_state is GameStateID.WINNER_WINNER:
-                self.current_state = GameWon(self.gamedata)
-            elif new_state is GameStateID.EXIT:
+            if new_state is GameStateID.EXIT:
                 self.running = False
+            else:
+                self.current_state = self.states.get(new_state)
+                memory.transition(self.gamedata, self.current_state)
 
-    def render(self) -> None:
+    def render(self) -> bool:
         """ Renders the active game state
+
+        Presents the whole screen, only the rects the state says it
+        changed, or nothing at all. Returns False if nothing was presented.
+        """
+        dirty = self.current_state.render(self.screen)
+        if dirty is None:
+            pygame.display.flip()
+        elif dirty:
+            pygame.display.update(dirty)
+        else:
+            return False
+        return True
+
+    def saveCrash(self) -> None:
+        """ Saves the game being played so it can be recovered after a crash
         """
-        self.current_state.render(self.screen)
-        pygame.display.flip()
+        if self.current_state.id is not GameStateID.GAMEPLAY:
+            return
+
+        try:
+            import snapshot
+            snapshot.write(CRASH_FILE, snapshot.capture(self.current_state))
+            print(f'saved the game to {CRASH_FILE}, resume it with --snapshot {CRASH_FILE}')
+        except Exception as error:
+            print(f'unable to save the game: {error}')
 
     def run(self) -> None:
         """Run the game loop"""
@@ -193,27 +280,104 @@ class PirateGame:
         times = deque(maxlen=30)
 
         self.running = True
-        while self.running:
-            dt = clock.tick() / 1000.0
-            times.append(clock.get_fps())
-
-            self.update(dt)
-            self.render()
+        presented = True
+        first_frame = False
+        try:
+            while self.running:
+                # nothing changed last frame, so there's no need to spin flat out
+                dt = clock.tick(0 if presented else IDLE_FPS) / 1000.0
+                times.append(clock.get_fps())
+
+                with tracer.span("PirateGame.update"):
+                    self.update(dt)
+                with tracer.span("PirateGame.render"):
+                    presented = self.render()
+
+                # launching is over once the map and preloaded states are ready
+                if not profile.reported:
+                    if presented and not first_frame:
+                        profile.mark("first frame presented")
+                        first_frame = True
+                    if self.loading is None and self.states.idle():
+                        profile.report()
+        except Exception:
+            self.saveCrash()
+            raise
+        self.states.shutdown()
+        self.gamedata.audio.stop()
         pygame.quit()
 
 
 # initialises and starts the game running
 def main() -> None:
-    pygame.init()
-    pygame.font.init()
-    pygame.display.set_caption('Arrrrr!!! Me Pirate Game!')
+    parser = argparse.ArgumentParser(description="Arrrrr!!! Me Pirate Game!")
+    parser.add_argument("--trace", metavar="FILE",
+                        help="record a Chrome trace-event JSON file of the session")
+    parser.add_argument("--server", metavar="PORT", type=int, nargs="?", const=47777,
+                        help="host a headless game that local clients can join")
+    parser.add_argument("--connect", metavar="HOST[:PORT]",
+                        help="join a game hosted with --server")
+    parser.add_argument("--snapshot", metavar="FILE",
+                        help="start playing from a saved snapshot, i.e. quicksave.sav")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="print where the time goes while the game launches")
+    parser.add_argument("--memory-report", action="store_true",
+                        help="track allocations for the memory report, F3 in game or on exit when headless")
+    args = parser.parse_args()
+
+    if args.memory_report:
+        memory.start()
+
+    if args.profile_startup:
+        profile.enabled = True
+        profile.record("python imports", LAUNCHED, time.perf_counter())
+
+    if args.trace:
+        tracer.start(args.trace)
+
+    # the server never shows a window
+    headless = args.server is not None
+    if headless:
+        os.environ["SDL_VIDEODRIVER"] = "dummy"
+
+    # the mixer is left to initialise itself on first use, see Audio
+    with profile.stage("initialise pygame"):
+        pygame.display.init()
+        pygame.font.init()
+        pygame.display.set_caption('Arrrrr!!! Me Pirate Game!')
 
     try:
-        game = PirateGame()
-        game.run()
+        game = PirateGame(headless)
+
+        # everything but the menu needs the map straight away
+        if headless or args.connect or args.snapshot:
+            game.waitLoaded()
+
+        if headless:
+            profile.report()
+            from network import Server
+            gameplay = game.states.get(GameStateID.GAMEPLAY)
+            memory.transition(game.gamedata, gameplay)
+            try:
+                Server(gameplay, args.server).run()
+            finally:
+                if args.memory_report:
+                    print(memory.report(game.gamedata, gameplay))
+        else:
+            if args.connect:
+                from network import Client, DEFAULT_PORT
+                from networkplay import NetworkPlay
+                host, _, port = args.connect.partition(":")
+                game.current_state = NetworkPlay(game.gamedata, Client(host, int(port) if port else DEFAULT_PORT))
+            elif args.snapshot:
+                import snapshot
+                game.current_state = game.states.get(GameStateID.GAMEPLAY)
+                snapshot.load(game.current_state, args.snapshot)
+            game.run()
     except KeyboardInterrupt:
         pass
     finally:
+        tracer.stop()
         pygame.quit()
 
     exit(0)
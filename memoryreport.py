@@ -0,0 +1,246 @@
+import tracemalloc
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+import pygame
+
+import assets
+
+TOP_ALLOCATORS = 10     # lines listed from tracemalloc
+TOP_ASSETS = 10         # largest shared images listed
+
+
+def surface_bytes(surface: Optional[pygame.Surface]) -> int:
+    """ The size of a surface's pixel buffer, 0 for None """
+    if surface is None:
+        return 0
+    return surface.get_pitch() * surface.get_height()
+
+
+def kib(size: int) -> str:
+    return f'{size / 1024:,.1f} KiB'
+
+
+class NullMeasure:
+    """ The measure handed out while reporting is disabled, it does nothing """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        pass
+
+
+class Measure:
+    """ Records the peak memory allocated by a block of code """
+
+    __slots__ = ("report", "name", "before")
+
+    def __init__(self, report, name: str) -> None:
+        self.report = report
+        self.name = name
+        self.before = 0
+
+    def __enter__(self):
+        tracemalloc.reset_peak()
+        self.before = tracemalloc.get_traced_memory()[0]
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.report.record_peak(self.name, tracemalloc.get_traced_memory()[1] - self.before)
+
+
+class MemoryReport:
+    """ Accounts for where the game's memory goes
+
+    Builds a text report of the surfaces held by each asset and cache,
+    the sprites in each of a state's groups, the peak allocations of the
+    path finders and the lines of code that have allocated the most.
+    Allocation tracking uses tracemalloc, which slows the game down, so
+    it only runs once start is called, i.e. with --memory-report. The
+    rest of the report works either way.
+
+    Every time a state becomes active, transition compares memory with
+    the last time the same state became active. Memory that keeps
+    growing across the same transition is a leak.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.peaks: Dict[str, Tuple[int, int]] = {}     # name -> (peak bytes, calls)
+        self.snapshots: Dict[object, Tuple[tracemalloc.Snapshot, int]] = {}
+        self.null_measure = NullMeasure()
+
+    def start(self) -> None:
+        """ Starts tracking allocations """
+        tracemalloc.start()
+        self.enabled = True
+
+    def measure(self, name: str):
+        """ Returns a context manager recording the peak allocated inside it
+
+        Args:
+            name (str): The name listed in the report
+        """
+        if not self.enabled:
+            return self.null_measure
+        return Measure(self, name)
+
+    def record_peak(self, name: str, size: int) -> None:
+        peak, calls = self.peaks.get(name, (0, 0))
+        self.peaks[name] = (max(peak, size), calls + 1)
+
+    def surfaces(self, gamedata) -> List[Tuple[str, int]]:
+        """ The bytes held in surfaces, by asset or cache
+
+        Args:
+            gamedata (GameData): The game's shared data
+        """
+        gamemap = gamedata.gamemap
+        renderer = gamemap.map
+        tiles = getattr(getattr(getattr(renderer, "data", None), "tmx", None), "images", None) or []
+
+        surfaces = [
+            ("screen", surface_bytes(pygame.display.get_surface())),
+            ("shared images", sum(surface_bytes(image) for image in assets.images.values())),
+            ("map tiles", sum(surface_bytes(image) for image in tiles)),
+            ("map buffer", surface_bytes(getattr(renderer, "_buffer", None)) +
+             surface_bytes(getattr(renderer, "_zoom_buffer", None))),
+            ("zoom layers", sum(surface_bytes(layer) for layer in gamemap.zoom_layers.values())),
+            ("zoomed sprites", sum(surface_bytes(scaled) for _, scaled in gamemap.zoomed_sprites.values())),
+        ]
+        if gamedata.minimap is not None:
+            surfaces.append(("minimap", surface_bytes(gamedata.minimap.base) + surface_bytes(gamedata.minimap.frame)))
+        return surfaces
+
+    def sprite_groups(self, state) -> Dict[str, Dict[str, int]]:
+        """ Counts a state's sprites by class, for each group or list of sprites it holds """
+        groups = {}
+        for name, value in vars(state).items():
+            if isinstance(value, pygame.sprite.AbstractGroup):
+                sprites = value.sprites()
+            elif isinstance(value, list) and value and isinstance(value[0], pygame.sprite.Sprite):
+                sprites = value
+            else:
+                continue
+
+            counts = {}
+            for sprite in sprites:
+                counts[type(sprite).__name__] = counts.get(type(sprite).__name__, 0) + 1
+            groups[name] = counts
+        return groups
+
+    def sprite_images(self, state) -> int:
+        """ The bytes of sprite images that aren't shared, i.e. rotated ships """
+        shared = {id(image) for image in assets.images.values()}
+        images = {}
+        for value in vars(state).values():
+            if isinstance(value, pygame.sprite.AbstractGroup):
+                for sprite in value.sprites():
+                    image = getattr(sprite, "image", None)
+                    if image is not None and id(image) not in shared:
+                        images[id(image)] = surface_bytes(image)
+        return sum(images.values())
+
+    def report(self, gamedata, state) -> str:
+        """ Builds the full memory report
+
+        Args:
+            gamedata (GameData): The game's shared data
+            state (GameState): The active state
+        """
+        lines = [f'memory report for {state.id.name}', "surfaces:"]
+        surfaces = self.surfaces(gamedata) + [("sprite images", self.sprite_images(state))]
+        for name, size in surfaces:
+            lines.append(f'  {name:<16}{kib(size):>16}')
+        lines.append(f'  {"total":<16}{kib(sum(size for _, size in surfaces)):>16}')
+
+        lines.append("largest shared images:")
+        largest = sorted(assets.images.items(), key=lambda item: surface_bytes(item[1]), reverse=True)
+        for filename, image in largest[:TOP_ASSETS]:
+            lines.append(f'  {kib(surface_bytes(image)):>12}  {filename}')
+
+        audio = gamedata.audio
+        if audio.effects and pygame.mixer.get_init():
+            frequency, size, channels = pygame.mixer.get_init()
+            effects = sum(sound.get_length() * frequency * abs(size) // 8 * channels
+                          for sound in audio.effects.values())
+            lines.append(f'sound effects: {len(audio.effects)}, {kib(int(effects))}')
+
+        lines.append("sprites:")
+        for name, counts in self.sprite_groups(state).items():
+            detail = ", ".join(f'{count} {kind}' for kind, count in counts.items())
+            lines.append(f'  {name}: {detail or "empty"}')
+
+        ships = getattr(state, "ships", None)
+        if ships is not None:
+            columns = sum(len(column) * column.itemsize
+                          for column in (getattr(ships, slot) for slot in ships.__slots__)
+                          if isinstance(column, array))
+            waypoints = sum(len(path) for path in ships.paths)
+            lines.append(f'ship store: {len(ships)} ships, columns {kib(columns)}, {waypoints} waypoints')
+
+        if not self.enabled:
+            lines.append("allocations aren't tracked, run with --memory-report")
+            return "\n".join(lines)
+
+        lines.append(f'traced: {kib(tracemalloc.get_traced_memory()[0])}')
+
+        lines.append("path finder peaks:")
+        for name, (size, calls) in self.peaks.items():
+            lines.append(f'  {name}: {kib(size)} over {calls} calls')
+
+        lines.append("top allocators:")
+        snapshot = self.take_snapshot()
+        for stat in snapshot.statistics("lineno")[:TOP_ALLOCATORS]:
+            frame = stat.traceback[0]
+            lines.append(f'  {kib(stat.size):>12} {stat.count:>8} blocks  {frame.filename}:{frame.lineno}')
+        return "\n".join(lines)
+
+    def summary(self, gamedata, state) -> str:
+        """ A one line summary for the debug overlay """
+        surfaces = sum(size for _, size in self.surfaces(gamedata)) + self.sprite_images(state)
+        text = f'Memory: surfaces {kib(surfaces)}'
+        if self.enabled:
+            text += f', traced {kib(tracemalloc.get_traced_memory()[0])}'
+        return text
+
+    def take_snapshot(self) -> tracemalloc.Snapshot:
+        """ Takes a tracemalloc snapshot, leaving out the memory used to report """
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+
+    def transition(self, gamedata, state) -> None:
+        """ Prints how memory changed since the state last became active
+
+        Args:
+            gamedata (GameData): The game's shared data
+            state (GameState): The state that has just become active
+        """
+        if not self.enabled:
+            return
+
+        snapshot = self.take_snapshot()
+        surfaces = sum(size for _, size in self.surfaces(gamedata)) + self.sprite_images(state)
+        previous = self.snapshots.get(state.id)
+        self.snapshots[state.id] = (snapshot, surfaces)
+        if previous is None:
+            return
+
+        differences = snapshot.compare_to(previous[0], "lineno")
+        growth = sum(difference.size_diff for difference in differences)
+        print(f'memory since entering {state.id.name} last time: {growth / 1024:+,.1f} KiB traced, '
+              f'{(surfaces - previous[1]) / 1024:+,.1f} KiB surfaces')
+        for difference in differences[:TOP_ALLOCATORS]:
+            if difference.size_diff <= 0:
+                break
+            frame = difference.traceback[0]
+            print(f'  {difference.size_diff / 1024:+12,.1f} KiB {difference.count_diff:+8} blocks  '
+                  f'{frame.filename}:{frame.lineno}')
+
+
+# the memory report shared by the whole game
+memory = MemoryReport()
@@ -0,0 +1,106 @@
+from typing import Iterable, List, Optional, Tuple
+
+import pygame
+
+from gamemap import GameMap
+
+WATER_COLOUR = (64, 120, 200)
+SHALLOW_COLOUR = (200, 190, 130)
+LAND_COLOUR = (70, 130, 60)
+ISLAND_COLOUR = (40, 80, 30)
+VIEW_COLOUR = (255, 255, 255)
+
+
+class Minimap:
+    """ A small overview of the whole world
+
+    The cost map and island rectangles are drawn on to a base surface
+    once when the map is loaded. Each frame the base is copied and only
+    the ship and cannon ball markers are drawn on top. If tile costs
+    change, update_tiles repaints just those tiles.
+    """
+
+    def __init__(self, gamemap: GameMap, pixels_per_tile: int = 4) -> None:
+        """ Rasterises the cost map and islands
+
+        Args:
+            gamemap (GameMap): The loaded game map
+            pixels_per_tile (int): The size of a tile on the minimap
+        """
+        self.gamemap = gamemap
+        self.scale = pixels_per_tile
+        self.tile_size = (gamemap.tile_w, gamemap.tile_h)
+
+        rows = len(gamemap.costs)
+        cols = len(gamemap.costs[0])
+        self.base = pygame.Surface((cols * self.scale, rows * self.scale))
+        self.frame = self.base.copy()
+        self.rect = self.base.get_rect()
+
+        self.update_tiles((x, y) for y in range(rows) for x in range(cols))
+
+    def colour(self, cost: int) -> Tuple[int, int, int]:
+        """ The colour to draw a tile with the given cost """
+        if cost > 100:
+            return LAND_COLOUR
+        elif cost > 0:
+            return SHALLOW_COLOUR
+        return WATER_COLOUR
+
+    def to_minimap(self, world_space: Tuple[float, float]) -> Tuple[int, int]:
+        """ Translate world space co-ordinates to a position on the minimap """
+        return (int(world_space[0] * self.scale / self.tile_size[0]),
+                int(world_space[1] * self.scale / self.tile_size[1]))
+
+    def update_tiles(self, tiles: Iterable[Tuple[int, int]]) -> None:
+        """ Repaints the given tiles and any islands over them
+
+        Args:
+            tiles (Iterable[Tuple[int,int]]): The tiles whose cost changed
+        """
+        dirty = []
+        for x, y in tiles:
+            rect = pygame.Rect(x * self.scale, y * self.scale, self.scale, self.scale)
+            self.base.fill(self.colour(self.gamemap.costs[y][x]), rect)
+            dirty.append(rect)
+
+        if not dirty:
+            return
+
+        area = dirty[0].unionall(dirty[1:])
+        for island in self.gamemap.islands:
+            topleft = self.to_minimap(island.topleft)
+            bottomright = self.to_minimap(island.bottomright)
+            rect = pygame.Rect(topleft, (bottomright[0] - topleft[0], bottomright[1] - topleft[1]))
+            if rect.colliderect(area):
+                pygame.draw.rect(self.base, ISLAND_COLOUR, rect, 1)
+
+    def tile_at(self, screen_pos: Tuple[int, int]) -> Optional[Tuple[int, int]]:
+        """ Returns the tile under a screen position or None if it's not over the minimap
+
+        Args:
+            screen_pos (Tuple[int,int]): The position on screen, i.e. a mouse click
+        """
+        if not self.rect.collidepoint(screen_pos):
+            return None
+        return (screen_pos[0] - self.rect.x) // self.scale, (screen_pos[1] - self.rect.y) // self.scale
+
+    def render(self, screen: pygame.Surface, markers: List[Tuple[Tuple[float, float], Tuple[int, int, int], int]]) -> None:
+        """ Draws the minimap in the bottom right corner of the screen
+
+        Args:
+            screen (pygame.Surface): The window to render to
+            markers (List): A (world position, colour, radius) for each marker
+        """
+        self.rect.bottomright = (screen.get_width() - 15, screen.get_height() - 15)
+        self.frame.blit(self.base, (0, 0))
+
+        for position, colour, radius in markers:
+            pygame.draw.circle(self.frame, colour, self.to_minimap(position), radius)
+
+        view = self.gamemap.view_rect()
+        topleft = self.to_minimap(view.topleft)
+        bottomright = self.to_minimap(view.bottomright)
+        pygame.draw.rect(self.frame, VIEW_COLOUR, (topleft, (bottomright[0] - topleft[0], bottomright[1] - topleft[1])), 1)
+
+        screen.blit(self.frame, self.rect)
@@ -0,0 +1,368 @@
+import socket
+import struct
+import time
+import weakref
+from typing import Dict, List, Optional, Tuple
+
+import pygame
+
+from cannonball import CannonBall
+from gameplay import GamePlay
+from gamestate import GameStateID
+from memoryreport import memory
+from player import Player
+
+DEFAULT_PORT = 47777
+TICK_RATE = 60              # server simulation ticks per second
+SNAPSHOT_RATE = 20          # snapshots sent to each client per second
+MAX_SNAPSHOT_BYTES = 1200   # snapshot budget, keeps a snapshot in one datagram
+CLIENT_TIMEOUT = 5.0        # seconds of silence before a client is dropped
+HISTORY = 32                # snapshots remembered for delta compression
+INTERPOLATION_DELAY = 0.1   # seconds the client renders behind the server
+POSITION_SCALE = 8          # positions are sent in 1/8ths of a pixel
+
+# message types
+HELLO = 0
+WELCOME = 1
+INPUT = 2
+SNAPSHOT = 3
+
+# input kinds
+ACK = 0
+MOVE = 1
+FIRE = 2
+
+# entity kinds
+SHIP = 0
+CANNONBALL = 1
+ENEMY = 2
+REMOVED = 255
+
+WELCOME_FORMAT = struct.Struct('<BH')
+INPUT_FORMAT = struct.Struct('<BIBhh')
+SNAPSHOT_FORMAT = struct.Struct('<BIIIH')
+ENTITY_FORMAT = struct.Struct('<HBHHBBB')
+MAX_ENTITIES = (MAX_SNAPSHOT_BYTES - SNAPSHOT_FORMAT.size) // ENTITY_FORMAT.size
+
+CANNONBALL_IDS = 0x8000     # cannon ball ids start here, ship ids are below
+
+
+def quantize(kind: int, position, hp: int = 0, condition: int = 0, heading: float = 0) -> Tuple:
+    """ Packs an entity's values in to the small integers sent over the wire """
+    return (kind,
+            max(0, min(int(position[0] * POSITION_SCALE), 0xFFFF)),
+            max(0, min(int(position[1] * POSITION_SCALE), 0xFFFF)),
+            max(0, min(hp, 0xFF)),
+            condition,
+            int(heading % 360 * 256 / 360) & 0xFF)
+
+
+class RemoteClient:
+    """ The server's view of a connected client """
+
+    def __init__(self, address, ship: Player) -> None:
+        self.address = address
+        self.ship = ship
+        self.last_heard = time.monotonic()
+        self.acked = 0
+        self.sent: Dict[int, Dict[int, Tuple]] = {}
+
+
+class Server:
+    """ Runs an authoritative GamePlay and shares it with clients over UDP
+
+    Each client that says hello is given a ship of its own. Clients send
+    their orders and the server sends back snapshots of the ships and
+    cannon balls at SNAPSHOT_RATE. A snapshot only contains the entities
+    that differ from the last snapshot the client acknowledged, with
+    positions quantized to 16 bits. When too much has changed to fit in
+    MAX_SNAPSHOT_BYTES, the entities closest to the client's ship go
+    first and the rest follow in later snapshots, so the bandwidth per
+    client is bounded however many entities there are.
+    """
+
+    def __init__(self, gameplay: GamePlay, port: int = DEFAULT_PORT, host: str = "127.0.0.1") -> None:
+        """ Takes over a game world and opens the socket
+
+        Args:
+            gameplay (GamePlay): The game world to run
+            port (int): The UDP port to listen on
+            host (str): The address to listen on, local only by default
+        """
+        self.gameplay = gameplay
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.bind((host, port))
+        self.socket.setblocking(False)
+
+        self.clients: Dict[Tuple, RemoteClient] = {}
+        self.snapshot_id = 0
+        self.tick = 0
+        self.running = False
+
+        self.cannonball_ids = weakref.WeakKeyDictionary()
+        self.next_cannonball_id = 0
+
+    def run(self) -> None:
+        """ Runs the simulation at TICK_RATE until interrupted """
+        clock = pygame.time.Clock()
+        ticks_per_snapshot = TICK_RATE // SNAPSHOT_RATE
+
+        self.running = True
+        while self.running:
+            dt = clock.tick(TICK_RATE) / 1000.0
+            self.receive()
+            self.update(dt)
+            if self.tick % ticks_per_snapshot == 0:
+                self.broadcast()
+        self.socket.close()
+
+    def update(self, dt: float) -> None:
+        """ Ticks the game world, restarting it when the game ends """
+        self.tick += 1
+        if self.gameplay.update(dt) is not GameStateID.GAMEPLAY:
+            self.gameplay.reset()
+            memory.transition(self.gameplay.gamedata, self.gameplay)
+
+        now = time.monotonic()
+        for address, client in list(self.clients.items()):
+            if now - client.last_heard > CLIENT_TIMEOUT:
+                self.disconnect(address)
+
+    def receive(self) -> None:
+        """ Handles every datagram waiting on the socket """
+        while True:
+            try:
+                packet, address = self.socket.recvfrom(2048)
+            except (BlockingIOError, InterruptedError):
+                return
+            except ConnectionResetError:
+                continue
+
+            if not packet:
+                continue
+
+            if packet[0] == HELLO:
+                client = self.clients.get(address) or self.connect(address)
+                self.socket.sendto(WELCOME_FORMAT.pack(WELCOME, client.ship.index), address)
+
+            elif packet[0] == INPUT and len(packet) == INPUT_FORMAT.size and address in self.clients:
+                self.handle_input(self.clients[address], *INPUT_FORMAT.unpack(packet)[1:])
+
+    def connect(self, address) -> RemoteClient:
+        """ Gives a new client a ship at the player's starting position """
+        ship = Player(self.gameplay.ships)
+        ship.position = self.gameplay.player.position
+        ship.destination = ship.position
+        ship.update(0)
+        self.gameplay.group.add(ship)
+
+        client = RemoteClient(address, ship)
+        self.clients[address] = client
+        return client
+
+    def disconnect(self, address) -> None:
+        """ Removes a client and its ship """
+        client = self.clients.pop(address)
+        planner = self.gameplay.planners.pop(client.ship, None)
+        if planner is not None:
+            planner.release()
+        self.gameplay.group.remove(client.ship)
+        self.gameplay.ships.remove(client.ship.index)
+
+    def handle_input(self, client: RemoteClient, ack: int, kind: int, a: int, b: int) -> None:
+        """ Applies a client's order and records its latest acknowledgement """
+        client.last_heard = time.monotonic()
+        if ack in client.sent:
+            client.acked = max(client.acked, ack)
+
+        gamemap = self.gameplay.gamedata.gamemap
+        if kind == MOVE:
+            if 0 <= b < len(gamemap.costs) and 0 <= a < len(gamemap.costs[0]) and gamemap.costs[b][a] < 100:
+                self.gameplay.plan(client.ship, (a, b))
+
+        elif kind == FIRE:
+            cannonball = CannonBall(client.ship.rect.center, pygame.Vector2(a, b))
+            self.gameplay.cannonballs.append(cannonball)
+            self.gameplay.group.add(cannonball)
+
+    def world_state(self) -> Dict[int, Tuple]:
+        """ Quantizes every ship and cannon ball, keyed by network id """
+        store = self.gameplay.ships
+        enemies = {enemy.index for enemy in self.gameplay.enemies}
+        state = {}
+        for index in store.indices():
+            state[index] = quantize(ENEMY if index in enemies else SHIP, (store.x[index], store.y[index]),
+                                    store.hp[index], store.condition[index], store.heading[index])
+
+        for cannonball in self.gameplay.cannonballs:
+            entity = self.cannonball_ids.get(cannonball)
+            if entity is None:
+                entity = CANNONBALL_IDS + self.next_cannonball_id
+                self.next_cannonball_id = (self.next_cannonball_id + 1) % CANNONBALL_IDS
+                self.cannonball_ids[cannonball] = entity
+            state[entity] = quantize(CANNONBALL, cannonball.rect.topleft)
+        return state
+
+    def broadcast(self) -> None:
+        """ Sends each client a delta snapshot against what it last acknowledged """
+        if not self.clients:
+            return
+
+        self.snapshot_id += 1
+        state = self.world_state()
+        for client in self.clients.values():
+            self.send_snapshot(client, state)
+
+    def send_snapshot(self, client: RemoteClient, state: Dict[int, Tuple]) -> None:
+        baseline_id = client.acked if client.acked in client.sent else 0
+        baseline = client.sent.get(baseline_id, {})
+
+        changed = [entity for entity, values in state.items() if baseline.get(entity) != values]
+        removed = [entity for entity in baseline if entity not in state]
+
+        # closest first, so whatever doesn't fit is far from the client's ship
+        ship_x = client.ship.position[0] * POSITION_SCALE
+        ship_y = client.ship.position[1] * POSITION_SCALE
+        changed.sort(key=lambda entity: abs(state[entity][1] - ship_x) + abs(state[entity][2] - ship_y))
+
+        records = []
+        known = dict(baseline)
+        for entity in removed[:MAX_ENTITIES]:
+            records.append(ENTITY_FORMAT.pack(entity, REMOVED, 0, 0, 0, 0, 0))
+            del known[entity]
+        for entity in changed[:MAX_ENTITIES - len(records)]:
+            records.append(ENTITY_FORMAT.pack(entity, *state[entity]))
+            known[entity] = state[entity]
+
+        # remember what the client will know once it applies this snapshot
+        client.sent[self.snapshot_id] = known
+        for old in [snapshot for snapshot in client.sent if snapshot <= self.snapshot_id - HISTORY]:
+            del client.sent[old]
+
+        header = SNAPSHOT_FORMAT.pack(SNAPSHOT, self.snapshot_id, baseline_id, self.tick, len(records))
+        self.socket.sendto(header + b"".join(records), client.address)
+
+
+class Client:
+    """ Connects to a Server, sends orders and interpolates its snapshots
+
+    Snapshots are applied on top of the baseline they were built from
+    and acknowledged so the server can keep sending small deltas. The
+    world is shown INTERPOLATION_DELAY behind the newest snapshot,
+    blending between the two snapshots either side of that time.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = DEFAULT_PORT) -> None:
+        """ Opens the socket and says hello to the server
+
+        Args:
+            host (str): The server's address
+            port (int): The server's UDP port
+        """
+        self.address = (host, port)
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.setblocking(False)
+
+        self.ship_id: Optional[int] = None
+        self.states: Dict[int, Dict[int, Tuple]] = {0: {}}
+        self.latest = 0
+        self.timeline: List[Tuple[float, Dict[int, Tuple]]] = []
+        self.last_hello = 0.0
+
+    def send(self, kind: int = ACK, a: int = 0, b: int = 0) -> None:
+        """ Sends an order along with the latest snapshot acknowledgement """
+        self.socket.sendto(INPUT_FORMAT.pack(INPUT, self.latest, kind, a, b), self.address)
+
+    def move(self, tile: Tuple[int, int]) -> None:
+        """ Orders the client's ship to sail to a tile """
+        self.send(MOVE, tile[0], tile[1])
+
+    def fire(self, world_space: Tuple[int, int]) -> None:
+        """ Fires a cannon ball from the client's ship towards a world-space position """
+        self.send(FIRE, int(world_space[0]), int(world_space[1]))
+
+    def poll(self) -> None:
+        """ Handles every datagram from the server, call once per frame """
+        now = time.monotonic()
+        if self.ship_id is None and now - self.last_hello > 0.5:
+            self.socket.sendto(bytes([HELLO]), self.address)
+            self.last_hello = now
+
+        received = False
+        while True:
+            try:
+                packet, _ = self.socket.recvfrom(65536)
+            except (BlockingIOError, InterruptedError):
+                break
+            except ConnectionResetError:
+                continue
+
+            if packet and packet[0] == WELCOME and len(packet) == WELCOME_FORMAT.size:
+                self.ship_id = WELCOME_FORMAT.unpack(packet)[1]
+            elif packet and packet[0] == SNAPSHOT:
+                received = self.apply(packet, now) or received
+
+        if received:
+            self.send()
+
+    def apply(self, packet: bytes, now: float) -> bool:
+        """ Rebuilds the world from a snapshot and its baseline
+
+        Returns False if the snapshot is out of date or its baseline
+        has been forgotten.
+        """
+        _, snapshot_id, baseline_id, _, count = SNAPSHOT_FORMAT.unpack_from(packet)
+        baseline = self.states.get(baseline_id)
+        if snapshot_id <= self.latest or baseline is None:
+            return False
+
+        state = dict(baseline)
+        for i in range(count):
+            entity, *values = ENTITY_FORMAT.unpack_from(packet, SNAPSHOT_FORMAT.size + i * ENTITY_FORMAT.size)
+            if values[0] == REMOVED:
+                state.pop(entity, None)
+            else:
+                state[entity] = tuple(values)
+
+        self.states[snapshot_id] = state
+        for old in [snapshot for snapshot in self.states if 0 < snapshot <= snapshot_id - HISTORY]:
+            del self.states[old]
+        self.latest = snapshot_id
+
+        self.timeline.append((now, state))
+        del self.timeline[:-8]
+        return True
+
+    def entities(self) -> Dict[int, Tuple[int, float, float, int, int, float]]:
+        """ The interpolated (kind, x, y, hp, condition, heading) of each entity
+
+        Positions are in world space and the heading is in degrees.
+        """
+        if not self.timeline:
+            return {}
+
+        render_time = time.monotonic() - INTERPOLATION_DELAY
+        before = after = self.timeline[-1]
+        for earlier, later in zip(self.timeline, self.timeline[1:]):
+            if earlier[0] <= render_time <= later[0]:
+                before, after = earlier, later
+                break
+        else:
+            if render_time < self.timeline[0][0]:
+                before = after = self.timeline[0]
+
+        span = after[0] - before[0]
+        blend = (render_time - before[0]) / span if span > 0 else 1.0
+
+        entities = {}
+        for entity, values in after[1].items():
+            kind, x, y, hp, condition, heading = values
+            previous = before[1].get(entity)
+            if previous is not None:
+                x = previous[1] + (x - previous[1]) * blend
+                y = previous[2] + (y - previous[2]) * blend
+            entities[entity] = (kind, x / POSITION_SCALE, y / POSITION_SCALE, hp, condition, heading * 360 / 256)
+        return entities
+
+    def close(self) -> None:
+        self.socket.close()
@@ -0,0 +1,90 @@
+import pygame
+
+from assets import load_images
+from gamedata import GameData
+from gamestate import GameState, GameStateID
+from network import CANNONBALL, ENEMY, Client
+
+PLAYER_IMAGES = ["data/sprites/ships/ship (2).png",
+                 "data/sprites/ships/ship (8).png",
+                 "data/sprites/ships/ship (14).png",
+                 "data/sprites/ships/ship (20).png"]
+ENEMY_IMAGES = ["data/sprites/ships/ship (4).png",
+                "data/sprites/ships/ship (10).png",
+                "data/sprites/ships/ship (16).png",
+                "data/sprites/ships/ship (22).png"]
+CANNONBALL_IMAGE = "data/sprites/ship parts/cannonBall.png"
+
+
+class NetworkPlay(GameState):
+    """ Plays a game hosted by a Server
+
+    The client doesn't simulate anything itself. It sends the player's
+    orders to the server and draws the interpolated snapshots it gets
+    back, following the ship the server gave it.
+    """
+
+    def __init__(self, data: GameData, client: Client) -> None:
+        """ Prepares the images used to draw the remote world
+
+        Args:
+            data (GameData): The game's shared data, with the map loaded
+            client (Client): The connection to the server
+        """
+        super().__init__(data)
+        self.id = GameStateID.NETWORK_PLAY
+        self.client = client
+        self.images = {
+            ENEMY: load_images(ENEMY_IMAGES),
+            CANNONBALL: load_images([CANNONBALL_IMAGE]),
+        }
+        self.player_images = load_images(PLAYER_IMAGES)
+        self.rotated = {}
+
+    def input(self, event: pygame.event) -> None:
+        """ Sends left clicks as move orders and right clicks as cannon fire """
+        gamemap = self.gamedata.gamemap
+        if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+            self.client.move(gamemap.tile(gamemap.inverse(event.pos)))
+        elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 3:
+            self.client.fire(gamemap.inverse(event.pos))
+
+    def update(self, dt: float) -> GameStateID:
+        """ Receives the latest snapshots """
+        self.client.poll()
+        return self.id
+
+    def image(self, kind: int, condition: int, heading: float) -> pygame.Surface:
+        """ Returns a ship's image rotated to its heading, cached per degree """
+        if kind == CANNONBALL:
+            return self.images[CANNONBALL][0]
+
+        key = (kind, condition, int(heading))
+        image = self.rotated.get(key)
+        if image is None:
+            images = self.images[ENEMY] if kind == ENEMY else self.player_images
+            image = pygame.transform.rotozoom(images[condition], 90 - int(heading), 1)
+            self.rotated[key] = image
+        return image
+
+    def render(self, screen: pygame.Surface) -> None:
+        """ Draws the map and the remote ships and cannon balls """
+        gamemap = self.gamedata.gamemap
+        entities = self.client.entities()
+
+        own = entities.get(self.client.ship_id)
+        if own is not None:
+            gamemap.map.center((own[1], own[2]))
+
+        offset_x, offset_y = gamemap.map.get_center_offset()
+        surfaces = []
+        for kind, x, y, hp, condition, heading in entities.values():
+            image = self.image(kind, condition, heading)
+            rect = image.get_rect(topleft=(x + offset_x, y + offset_y))
+            surfaces.append((image, rect, 4))
+
+        gamemap.map.draw(screen, screen.get_rect(), surfaces)
+
+        if self.client.ship_id is None:
+            waiting = self.gamedata.fonts["debug"].render("Connecting...", True, (0, 0, 0))
+            screen.blit(waiting, (15, 25))
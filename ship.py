@@ -0,0 +1,93 @@
+from typing import List, Tuple
+
+import pygame
+
+from assets import load_images
+from shipcondition import ShipCondition
+from shipstore import ShipStore
+
+
+class Ship(pygame.sprite.Sprite):
+    """ A sprite that renders one ship from a ShipStore
+
+    The ship's position, path, health and condition are kept in the
+    store, this class only holds what is needed to draw it. The base
+    surfaces for each ship condition are shared between every ship
+    using the same images.
+    """
+
+    def __init__(self, filenames: List[str], store: ShipStore = None, speed: float = 0.0) -> None:
+        """ Adds the ship to the store and loads its images
+
+        Args:
+            filenames (List[str]): An image for each ShipCondition
+            store (ShipStore): The store to add the ship to, a new one if None
+            speed (float): How fast the ship follows its path
+        """
+        super().__init__()
+        self.store = store if store is not None else ShipStore()
+        self.index = self.store.add(speed=speed)
+
+        self.base_list = load_images(filenames)
+        self.base = self.base_list[0]
+        self.image = self.base
+        self.rect = self.image.get_rect()
+        self.heading = self.store.heading[self.index]
+
+    @property
+    def position(self) -> Tuple[float, float]:
+        return self.store.x[self.index], self.store.y[self.index]
+
+    @position.setter
+    def position(self, value: Tuple[float, float]) -> None:
+        self.store.x[self.index] = value[0]
+        self.store.y[self.index] = value[1]
+
+    @property
+    def destination(self) -> Tuple[float, float]:
+        return self.store.dest_x[self.index], self.store.dest_y[self.index]
+
+    @destination.setter
+    def destination(self, value: Tuple[float, float]) -> None:
+        self.store.dest_x[self.index] = value[0]
+        self.store.dest_y[self.index] = value[1]
+
+    @property
+    def path(self) -> list:
+        return self.store.paths[self.index]
+
+    @path.setter
+    def path(self, value: list) -> None:
+        self.store.paths[self.index] = value
+
+    @property
+    def hp(self) -> int:
+        return self.store.hp[self.index]
+
+    @hp.setter
+    def hp(self, value: int) -> None:
+        self.store.hp[self.index] = value
+
+    @property
+    def ship_condition(self) -> ShipCondition:
+        return ShipCondition(self.store.condition[self.index])
+
+    @ship_condition.setter
+    def ship_condition(self, value: ShipCondition) -> None:
+        self.store.condition[self.index] = value
+
+    def rotate(self, angle: float) -> None:
+        """rotates the image so that it always points to direction of travel"""
+        self.image = pygame.transform.rotozoom(self.base, 90 - angle, 1)
+        x, y = self.rect.center
+        self.rect = self.image.get_rect()
+        self.rect.center = (x, y)
+
+    def sync(self) -> None:
+        """ Updates the sprite from the ship's values in the store """
+        heading = self.store.heading[self.index]
+        if heading != self.heading:
+            self.heading = heading
+            self.rotate(heading)
+
+        self.rect.topleft = self.position
@@ -0,0 +1,139 @@
+from array import array
+from math import atan2, degrees, hypot
+from typing import List
+
+SHIP_STEP = 1.0     # distance moved per tick at a speed of 1
+
+
+class ShipStore:
+    """ Compact storage for every ship in the game
+
+    Rather than each ship sprite owning its own position, path and
+    health, the values live here in parallel arrays indexed by a ship
+    id. The systems below loop over the arrays directly, which keeps
+    thousands of ships cheap to store and update. Player and Enemy
+    sprites are thin views that read their ship's values back out to
+    render them.
+    """
+
+    __slots__ = ("x", "y", "dest_x", "dest_y", "vx", "vy", "speed", "heading",
+                 "hp", "condition", "alive", "paths", "free")
+
+    def __init__(self) -> None:
+        """ Creates an empty store """
+        self.x = array('d')
+        self.y = array('d')
+        self.dest_x = array('d')
+        self.dest_y = array('d')
+        self.vx = array('d')
+        self.vy = array('d')
+        self.speed = array('d')
+        self.heading = array('d')   # degrees, 90 is the unrotated sprite
+        self.hp = array('i')
+        self.condition = array('b')
+        self.alive = array('b')
+        self.paths: List[list] = []
+        self.free: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self.alive) - len(self.free)
+
+    def add(self, x: float = 0.0, y: float = 0.0, hp: int = 10, speed: float = 0.0) -> int:
+        """ Adds a ship to the store and returns its id
+
+        Ids of removed ships are reused before the arrays are grown.
+
+        Args:
+            x (float): The world-space x position
+            y (float): The world-space y position
+            hp (int): The ship's starting health
+            speed (float): How fast the ship follows its path
+        """
+        if self.free:
+            index = self.free.pop()
+            self.x[index] = self.dest_x[index] = x
+            self.y[index] = self.dest_y[index] = y
+            self.vx[index] = self.vy[index] = 0.0
+            self.speed[index] = speed
+            self.heading[index] = 90.0
+            self.hp[index] = hp
+            self.condition[index] = 0
+            self.alive[index] = 1
+            self.paths[index] = []
+            return index
+
+        self.x.append(x)
+        self.y.append(y)
+        self.dest_x.append(x)
+        self.dest_y.append(y)
+        self.vx.append(0.0)
+        self.vy.append(0.0)
+        self.speed.append(speed)
+        self.heading.append(90.0)
+        self.hp.append(hp)
+        self.condition.append(0)
+        self.alive.append(1)
+        self.paths.append([])
+        return len(self.alive) - 1
+
+    def remove(self, index: int) -> None:
+        """ Removes a ship, its id may be handed out again by add
+
+        Args:
+            index (int): The ship's id
+        """
+        self.alive[index] = 0
+        self.paths[index] = []
+        self.free.append(index)
+
+    def indices(self) -> List[int]:
+        """ Returns the ids of all the ships in the store """
+        return [index for index, alive in enumerate(self.alive) if alive]
+
+    def step_all(self) -> None:
+        """ Moves every ship one tick along its path
+
+        A ship heads for its destination at a constant speed and snaps
+        onto it once it is within a step. When it arrives, the next
+        waypoint is popped from its path and its heading is recalculated.
+        The velocity is aimed at the destination every tick, so a ship
+        that has been pushed off its leg still arrives.
+        """
+        x, y = self.x, self.y
+        dest_x, dest_y = self.dest_x, self.dest_y
+        vx, vy = self.vx, self.vy
+        speed, alive, paths = self.speed, self.alive, self.paths
+
+        for index in range(len(alive)):
+            if not alive[index] or speed[index] == 0:
+                continue
+
+            px = x[index]
+            py = y[index]
+            tx = dest_x[index]
+            ty = dest_y[index]
+
+            if px == tx and py == ty:
+                path = paths[index]
+                if not path:
+                    vx[index] = vy[index] = 0.0
+                    continue
+
+                waypoint = path.pop(0)
+                tx = dest_x[index] = int(waypoint[0])
+                ty = dest_y[index] = int(waypoint[1])
+                if tx == px and ty == py:
+                    continue
+                self.heading[index] = degrees(atan2(ty - py, tx - px))
+
+            dx = tx - px
+            dy = ty - py
+            distance = hypot(dx, dy)
+            if distance <= SHIP_STEP * speed[index]:
+                x[index] = tx
+                y[index] = ty
+            else:
+                vx[index] = dx / distance * SHIP_STEP
+                vy[index] = dy / distance * SHIP_STEP
+                x[index] = px + vx[index] * speed[index]
+                y[index] = py + vy[index] * speed[index]
@@ -0,0 +1,322 @@
+import io
+import os
+import random
+import struct
+import threading
+import zlib
+from array import array
+from math import isfinite
+
+import pygame
+
+from cannonball import CannonBall
+from intent import Intent
+from shipcondition import ShipCondition
+
+MAGIC = b"PIRATES2"
+COLUMNS = ("x", "y", "dest_x", "dest_y", "vx", "vy", "speed", "heading", "hp", "condition", "alive")
+NO_INTENT = 255
+
+# the FSM states a ship can be saved in, stored by their position here
+FSM_STATES = ("update_healthy", "update_damaged", "update_very_damaged", "dead")
+
+# random's state, version, the Mersenne Twister's words and the next gaussian
+RANDOM_FORMAT = "B625I?d"
+
+
+class Writer:
+    """ Appends little-endian values to a growing buffer """
+
+    def __init__(self) -> None:
+        self.buffer = io.BytesIO()
+
+    def put(self, fmt: str, *values) -> None:
+        self.buffer.write(struct.pack('<' + fmt, *values))
+
+    def put_bytes(self, data: bytes) -> None:
+        self.put('I', len(data))
+        self.buffer.write(data)
+
+    def getvalue(self) -> bytes:
+        return self.buffer.getvalue()
+
+
+class Reader:
+    """ Reads back the values appended by a Writer """
+
+    def __init__(self, data: bytes) -> None:
+        self.data = memoryview(data)
+        self.offset = 0
+
+    def get(self, fmt: str):
+        try:
+            values = struct.unpack_from('<' + fmt, self.data, self.offset)
+        except struct.error:
+            raise ValueError("snapshot is truncated") from None
+        self.offset += struct.calcsize('<' + fmt)
+        return values
+
+    def get_bytes(self) -> bytes:
+        length, = self.get('I')
+        if self.offset + length > len(self.data):
+            raise ValueError("snapshot is truncated")
+        data = self.data[self.offset:self.offset + length].tobytes()
+        self.offset += length
+        return data
+
+    def finish(self) -> None:
+        """ Checks that every byte has been read """
+        if self.offset != len(self.data):
+            raise ValueError(f"snapshot has {len(self.data) - self.offset} unexpected bytes at the end")
+
+
+def capture(gameplay) -> bytes:
+    """ Packs the whole simulation in to bytes, ready to be compressed
+
+    Covers every ship in the ShipStore including paths, the ships' FSM
+    states, intents and the score, live cannon balls, wrecks left on the
+    map and the random number generator. The store's columns are copied
+    as raw array bytes, so capturing is quick enough to do mid-frame.
+
+    Args:
+        gameplay (GamePlay): The running game to capture
+    """
+    writer = Writer()
+    store = gameplay.ships
+
+    writer.put('I', len(store.alive))
+    for column in COLUMNS:
+        writer.put_bytes(getattr(store, column).tobytes())
+    writer.put_bytes(array('i', store.free).tobytes())
+    for path in store.paths:
+        writer.put_bytes(array('d', [value for waypoint in path for value in waypoint[:2]]).tobytes())
+
+    views = ship_views(gameplay)
+    writer.put('I', len(views))
+    for ship in views:
+        writer.put('I', ship.index)
+        writer.put('B', FSM_STATES.index(ship.fsm.current_state.__name__))
+        writer.put('bBi', ship.prev_ship_condition, getattr(ship, "intent", NO_INTENT), getattr(ship, "score", 0))
+
+    writer.put('I', len(gameplay.cannonballs))
+    for cannonball in gameplay.cannonballs:
+        writer.put('4d', cannonball.position[0], cannonball.position[1],
+                   cannonball.destination[0], cannonball.destination[1])
+
+    costs = gameplay.gamedata.gamemap.costs
+    writer.put('I', len(gameplay.wrecks))
+    for (x, y), old_cost in gameplay.wrecks.items():
+        writer.put('HHii', x, y, old_cost, costs[y][x])
+
+    version, words, gauss = random.getstate()
+    writer.put(RANDOM_FORMAT, version, *words, gauss is not None, gauss or 0.0)
+    return writer.getvalue()
+
+
+def ship_views(gameplay) -> list:
+    """ The ship sprites whose FSMs are saved, always in the same order """
+    return [gameplay.player] + gameplay.escorts + gameplay.enemies
+
+
+def restore(gameplay, payload: bytes) -> None:
+    """ Puts a captured simulation back in to an existing GamePlay
+
+    Nothing is reloaded, the ship sprites, map group and surfaces of
+    the running game are reused. Route planners and the influence map
+    start afresh, the ships carry on along their saved paths. The whole
+    payload is read and checked before anything is changed, so a
+    corrupt snapshot raises ValueError and leaves the game as it was.
+
+    Args:
+        gameplay (GamePlay): The game to restore in to, built for the same map
+        payload (bytes): The bytes returned by capture
+    """
+    reader = Reader(payload)
+    store = gameplay.ships
+    gamemap = gameplay.gamedata.gamemap
+    bounds = gamemap.map.map_rect
+
+    def on_map(x: float, y: float) -> bool:
+        # false for NaN as well as for points off the map
+        return 0 <= x <= bounds.w and 0 <= y <= bounds.h
+
+    count, = reader.get('I')
+    columns = {}
+    for column in COLUMNS:
+        values = array(getattr(store, column).typecode)
+        data = reader.get_bytes()
+        if len(data) % values.itemsize:
+            raise ValueError(f"snapshot column {column} is corrupt")
+        values.frombytes(data)
+        if len(values) != count:
+            raise ValueError(f"snapshot column {column} has {len(values)} ships, expected {count}")
+        columns[column] = values
+
+    free = array('i')
+    free.frombytes(reader.get_bytes())
+    if any(not 0 <= index < count for index in free):
+        raise ValueError("snapshot has a free ship id out of range")
+
+    # the sprites are redrawn from these once applied, so they must be valid too
+    conditions = ShipCondition.__members__.values()
+    for index in range(count):
+        if columns["condition"][index] not in conditions:
+            raise ValueError(f"snapshot ship {index} has an unknown condition {columns['condition'][index]}")
+        if columns["alive"][index] not in (0, 1):
+            raise ValueError(f"snapshot ship {index} has an invalid alive flag {columns['alive'][index]}")
+        if not (on_map(columns["x"][index], columns["y"][index]) and
+                on_map(columns["dest_x"][index], columns["dest_y"][index])):
+            raise ValueError(f"snapshot ship {index} is off the map")
+        if not all(isfinite(columns[column][index]) for column in ("vx", "vy", "speed", "heading")):
+            raise ValueError(f"snapshot ship {index} has an invalid velocity or heading")
+    if any(columns["alive"][index] for index in free):
+        raise ValueError("snapshot has a free ship id that is still alive")
+
+    paths = []
+    for _ in range(count):
+        flat = array('d')
+        data = reader.get_bytes()
+        if len(data) % (2 * flat.itemsize):
+            raise ValueError("snapshot path is corrupt")
+        flat.frombytes(data)
+        if not all(on_map(flat[i], flat[i + 1]) for i in range(0, len(flat), 2)):
+            raise ValueError("snapshot path leaves the map")
+        paths.append([[flat[i], flat[i + 1]] for i in range(0, len(flat), 2)])
+
+    views = ship_views(gameplay)
+    saved, = reader.get('I')
+    if saved != len(views):
+        raise ValueError(f"snapshot has {saved} ships with a FSM, this game has {len(views)}")
+
+    ships = []
+    for ship in views:
+        index, state, prev_condition, intent, score = reader.get('IBbBi')
+        if index != ship.index or index >= count:
+            raise ValueError(f"snapshot ship {index} doesn't match ship {ship.index}")
+        if state >= len(FSM_STATES):
+            raise ValueError(f"snapshot ship {index} has an unknown state {state}")
+        if prev_condition not in ShipCondition.__members__.values():
+            raise ValueError(f"snapshot ship {index} has an unknown condition {prev_condition}")
+        if hasattr(ship, "intent") and intent not in Intent.__members__.values():
+            raise ValueError(f"snapshot ship {index} has an unknown intent {intent}")
+        ships.append((ship, FSM_STATES[state], prev_condition, intent, score))
+
+    balls, = reader.get('I')
+    cannonballs = [reader.get('4d') for _ in range(balls)]
+    if not all(on_map(x, y) and on_map(dest_x, dest_y) for x, y, dest_x, dest_y in cannonballs):
+        raise ValueError("snapshot has a cannonball off the map")
+
+    height, width = len(gamemap.costs), len(gamemap.costs[0])
+    wrecks, = reader.get('I')
+    wrecked = {}
+    old_costs = {}
+    for _ in range(wrecks):
+        x, y, old_cost, cost = reader.get('HHii')
+        if x >= width or y >= height:
+            raise ValueError(f"snapshot wreck at {x, y} is off the map")
+        old_costs[(x, y)] = old_cost
+        wrecked[(x, y)] = cost
+
+    version, *words, has_gauss, gauss = reader.get(RANDOM_FORMAT)
+    random_state = (version, tuple(words), gauss if has_gauss else None)
+    try:
+        random.Random().setstate(random_state)
+    except (ValueError, TypeError):
+        raise ValueError("snapshot has an invalid random state") from None
+    reader.finish()
+
+    # everything has been read, now apply it
+    for column, values in columns.items():
+        setattr(store, column, values)
+    store.free = free.tolist()
+    store.paths = paths
+
+    for ship, state, prev_condition, intent, score in ships:
+        ship.fsm.setstate(getattr(ship, state))
+        ship.prev_ship_condition = prev_condition
+        if hasattr(ship, "intent"):
+            ship.intent = Intent(intent)
+        if hasattr(ship, "score"):
+            ship.score = score
+
+        # redraw for the saved condition and rotate back to the saved heading
+        ship.redraw()
+        ship.heading = None
+        ship.sync()
+
+    for cannonball in gameplay.cannonballs:
+        gameplay.group.remove(cannonball)
+    gameplay.cannonballs.clear()
+
+    for x, y, dest_x, dest_y in cannonballs:
+        cannonball = CannonBall((x, y), pygame.Vector2(dest_x, dest_y))
+        cannonball.position = pygame.Vector2(x, y)
+        cannonball.rect.topleft = cannonball.position
+        gameplay.cannonballs.append(cannonball)
+        gameplay.group.add(cannonball)
+
+    if gameplay.wrecks:
+        gamemap.set_costs(gameplay.wrecks)
+    gameplay.wrecks = old_costs
+    if wrecked:
+        gamemap.set_costs(wrecked)
+
+    for planner in gameplay.planners.values():
+        planner.release()
+    gameplay.planners.clear()
+    gameplay.influence.clear()
+    gameplay.scheduleEnemies()
+
+    random.setstate(random_state)
+
+
+def save(gameplay, filename: str) -> threading.Thread:
+    """ Captures the game now and writes it to a file in the background
+
+    Only the capture happens on the calling thread, compressing and
+    writing the file is left to a worker thread so the frame isn't held
+    up. Join the returned thread to wait for the file to be written.
+
+    Args:
+        gameplay (GamePlay): The running game to save
+        filename (str): The file to write
+    """
+    payload = capture(gameplay)
+    writer = threading.Thread(target=write, args=(filename, payload), name="snapshot-writer")
+    writer.start()
+    return writer
+
+
+def write(filename: str, payload: bytes) -> None:
+    """ Compresses a captured payload and writes it to a file
+
+    The file is written alongside and then swapped in, so a crash while
+    writing never leaves a half written snapshot behind.
+    """
+    data = MAGIC + zlib.compress(payload, 1)
+    partial = filename + ".part"
+    with open(partial, "wb") as file:
+        file.write(data)
+    os.replace(partial, filename)
+
+
+def load(gameplay, filename: str) -> None:
+    """ Restores a game saved by save in to an existing GamePlay
+
+    Raises ValueError, without changing the game, if the file isn't a
+    valid snapshot for this game.
+
+    Args:
+        gameplay (GamePlay): The game to restore in to
+        filename (str): The file to read
+    """
+    with open(filename, "rb") as file:
+        data = file.read()
+
+    if not data.startswith(MAGIC):
+        raise ValueError(f"{filename} is not a game snapshot")
+    try:
+        payload = zlib.decompress(data[len(MAGIC):])
+    except zlib.error as error:
+        raise ValueError(f"{filename} is corrupt: {error}") from None
+    restore(gameplay, payload)
@@ -0,0 +1,99 @@
+from math import floor, hypot
+from typing import Any, Dict, List, Optional, Tuple
+
+import pygame
+
+CELL_SIZE = 128     # world-space size of a grid cell
+
+
+class SpatialGrid:
+    """ Buckets rectangles in to a uniform grid for fast collision queries
+
+    Each rect is stored in every cell it overlaps, so a query only has
+    to test the rects in the cells around it rather than every rect in
+    the world. Static rects such as the islands are inserted once,
+    moving ones can be cleared and inserted again every tick.
+    """
+
+    def __init__(self, cell_size: int = CELL_SIZE) -> None:
+        """ Creates an empty grid
+
+        Args:
+            cell_size (int): The world-space size of a cell
+        """
+        self.cell_size = cell_size
+        self.cells: Dict[Tuple[int, int], List[Tuple[Any, pygame.Rect]]] = {}
+
+    def cell_range(self, rect: pygame.Rect):
+        """ The cells a rect overlaps, as ranges of columns and rows """
+        size = self.cell_size
+        return (range(floor(rect.left / size), floor((rect.right - 1) / size) + 1),
+                range(floor(rect.top / size), floor((rect.bottom - 1) / size) + 1))
+
+    def insert(self, item: Any, rect: pygame.Rect) -> None:
+        """ Adds an item covering a world-space rect
+
+        Args:
+            item (Any): Returned by queries that hit the rect
+            rect (pygame.Rect): The item's collision rect
+        """
+        columns, rows = self.cell_range(rect)
+        for column in columns:
+            for row in rows:
+                self.cells.setdefault((column, row), []).append((item, rect))
+
+    def clear(self) -> None:
+        """ Removes every item """
+        self.cells.clear()
+
+    def nearby(self, rect: pygame.Rect) -> Dict[int, Tuple[Any, pygame.Rect]]:
+        """ The items stored in the cells a rect overlaps, keyed by id """
+        found = {}
+        columns, rows = self.cell_range(rect)
+        for column in columns:
+            for row in rows:
+                for item, item_rect in self.cells.get((column, row), ()):
+                    found[id(item)] = (item, item_rect)
+        return found
+
+    def sweep(self, start: Tuple[float, float], end: Tuple[float, float],
+              size: Tuple[int, int] = (0, 0)) -> Optional[Tuple[float, Any]]:
+        """ Finds the first item hit by a box moving along a segment
+
+        The box's top left corner moves from start to end. Each nearby
+        rect is grown by the box's size, so the box hits the rect exactly
+        when the segment crosses the grown rect.
+
+        Args:
+            start (Tuple[float,float]): Where the box's top left starts
+            end (Tuple[float,float]): Where the box's top left ends up
+            size (Tuple[int,int]): The width and height of the moving box
+
+        Returns:
+            (fraction, item) for the earliest hit, where fraction is how
+            far along the segment the hit happened, or None for no hit.
+        """
+        width, height = size
+        x1, y1 = int(start[0]), int(start[1])
+        x2, y2 = int(end[0]), int(end[1])
+        swept = pygame.Rect(min(x1, x2), min(y1, y2), abs(x2 - x1) + width + 1, abs(y2 - y1) + height + 1)
+        length = hypot(x2 - x1, y2 - y1)
+
+        best = None
+        for item, rect in self.nearby(swept).values():
+            grown = pygame.Rect(rect.x - width + 1, rect.y - height + 1, rect.w + width - 1, rect.h + height - 1)
+            if length == 0:
+                if grown.collidepoint(x1, y1):
+                    return 0.0, item
+                continue
+
+            clipped = grown.clipline(x1, y1, x2, y2)
+            if not clipped:
+                continue
+
+            entry = min(clipped, key=lambda point: hypot(point[0] - x1, point[1] - y1))
+            fraction = hypot(entry[0] - x1, entry[1] - y1) / length
+            if best is None or fraction < best[0]:
+                best = fraction, item
+
+        return best
@@ -0,0 +1,87 @@
+import threading
+import time
+from typing import List, Tuple
+
+# when this module was first imported, as close to launch as we can get
+LAUNCHED = time.perf_counter()
+
+
+class NullStage:
+    """ The stage handed out while profiling is disabled, it does nothing """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        pass
+
+
+class Stage:
+    """ Times one step of launching the game """
+
+    __slots__ = ("profile", "name", "begin")
+
+    def __init__(self, profile, name: str) -> None:
+        self.profile = profile
+        self.name = name
+        self.begin = 0.0
+
+    def __enter__(self):
+        self.begin = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.profile.record(self.name, self.begin, time.perf_counter())
+
+
+class StartupProfile:
+    """ Breaks down where the time goes while the game launches
+
+    Steps are timed with stage, from whichever thread runs them, and
+    report prints them in the order they started along with when they
+    started relative to launch. Steps that ran on a loader thread are
+    marked, as they overlap the steps on the main thread. When the
+    profile isn't enabled, stage returns immediately.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.reported = False
+        self.stages: List[Tuple[str, float, float, str]] = []
+        self.null_stage = NullStage()
+
+    def stage(self, name: str):
+        """ Returns a context manager that times the code inside it
+
+        Args:
+            name (str): The name of the step in the report
+        """
+        if not self.enabled:
+            return self.null_stage
+        return Stage(self, name)
+
+    def mark(self, name: str) -> None:
+        """ Records a moment, i.e. the first frame being presented """
+        if self.enabled:
+            now = time.perf_counter()
+            self.record(name, now, now)
+
+    def record(self, name: str, begin: float, end: float) -> None:
+        self.stages.append((name, begin, end, threading.current_thread().name))
+
+    def report(self) -> None:
+        """ Prints the steps recorded so far, only the first call prints """
+        if not self.enabled or self.reported:
+            return
+        self.reported = True
+
+        print("startup profile (ms)")
+        print(f"{'started':>9} {'took':>9}  step")
+        main_thread = threading.main_thread().name
+        for name, begin, end, thread in sorted(self.stages, key=lambda stage: stage[1]):
+            where = "" if thread == main_thread else f"  [{thread}]"
+            print(f"{(begin - LAUNCHED) * 1000:9.1f} {(end - begin) * 1000:9.1f}  {name}{where}")
+
+
+# the profile shared by the whole game
+profile = StartupProfile()
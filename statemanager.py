@@ -0,0 +1,98 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict
+
+from gamedata import GameData
+from gamestate import GameState, GameStateID
+from startupprofile import profile
+
+# which state we expect to be asked for next while a given state is on screen
+NEXT_LIKELY = {
+    GameStateID.START_MENU: GameStateID.GAMEPLAY,
+    GameStateID.GAME_OVER: GameStateID.START_MENU,
+    GameStateID.WINNER_WINNER: GameStateID.START_MENU,
+}
+
+
+class StateManager:
+    """ Creates, caches and warms up the game states
+
+    Building a state can be expensive, GamePlay for example has to
+    create the pyscroll group, load ship sprites and spawn enemies.
+    Rather than constructing a new state on every transition, the
+    manager keeps every state it has built and resets it in place
+    when it becomes active again. While a static screen such as the
+    menu is displayed, the next likely state is built on a background
+    thread so that the transition is effectively instant.
+    """
+
+    def __init__(self, data: GameData, factories: Dict[GameStateID, Callable[[GameData], GameState]]) -> None:
+        """ Initialises the manager
+
+        Args:
+            data (GameData): The game's shared data
+            factories (Dict[GameStateID, Callable]): Builds a state for an ID
+        """
+        self.gamedata = data
+        self.factories = factories
+        self.states: Dict[GameStateID, GameState] = {}
+        self.pending: Dict[GameStateID, Future] = {}
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="state-preload")
+
+    def get(self, state_id: GameStateID) -> GameState:
+        """ Returns a ready to use state for the given ID
+
+        A previously built state is reset rather than reallocated. If
+        the state is still being built in the background this waits
+        for it to finish, otherwise it is built immediately.
+
+        Args:
+            state_id (GameStateID): The state to activate
+        """
+        state = self.states.get(state_id)
+        if state is not None:
+            state.reset()
+        elif state_id in self.pending:
+            state = self.pending.pop(state_id).result()
+        else:
+            state = self.build(state_id)
+
+        self.states[state_id] = state
+        self.preload(NEXT_LIKELY.get(state_id))
+        return state
+
+    def preload(self, state_id) -> None:
+        """ Starts building a state in the background if it isn't already
+
+        Args:
+            state_id (GameStateID): The state to warm up, None is ignored
+        """
+        if state_id is None or state_id in self.states or state_id in self.pending:
+            return
+
+        self.pending[state_id] = self.executor.submit(self.build, state_id)
+
+    def build(self, state_id: GameStateID) -> GameState:
+        """ Constructs a new state with its factory """
+        with profile.stage(f"build {state_id.name}"):
+            return self.factories[state_id](self.gamedata)
+
+    def submit(self, task: Callable, *args) -> Future:
+        """ Runs a task on the preloading thread
+
+        Tasks run one at a time in the order they were submitted, along
+        with the states being preloaded. Anything a state needs to be
+        built, i.e. the map, can be submitted before it is preloaded.
+
+        Args:
+            task (Callable): The function to run
+            args: Passed to the task
+        """
+        return self.executor.submit(task, *args)
+
+    def idle(self) -> bool:
+        """ True when no state is being built in the background """
+        return all(future.done() for future in self.pending.values())
+
+    def shutdown(self) -> None:
+        """ Stops the preloading thread """
+        self.executor.shutdown(wait=True)